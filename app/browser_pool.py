@@ -0,0 +1,315 @@
+import asyncio
+import atexit
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright, Route
+
+
+# ============================================================================
+# POOL CONFIGURATION
+# ============================================================================
+
+POOL_SIZE = int(os.getenv('SCRAPER_BROWSER_POOL_SIZE', '3'))
+# Pages rendering at once = POOL_SIZE x CONTEXTS_PER_BROWSER. Unless set explicitly,
+# contexts follow the scrape worker count (SCRAPER_CONCURRENCY), capped per browser
+# for memory; workers beyond that wait for a context or take the HTTP fast path
+MAX_CONTEXTS_PER_BROWSER = int(os.getenv('SCRAPER_MAX_CONTEXTS_PER_BROWSER', '10'))
+CONTEXTS_PER_BROWSER = int(os.getenv('SCRAPER_CONTEXTS_PER_BROWSER', '0')) or max(1, min(
+    -(-int(os.getenv('SCRAPER_CONCURRENCY', '50')) // POOL_SIZE), MAX_CONTEXTS_PER_BROWSER
+))
+PAGES_PER_CONTEXT = int(os.getenv('SCRAPER_PAGES_PER_CONTEXT', '25'))
+PAGES_PER_BROWSER = int(os.getenv('SCRAPER_PAGES_PER_BROWSER', '250'))
+
+VIEWPORT = {'width': 1920, 'height': 1080}
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Request interception - resource types and hosts that never matter for extraction
+BLOCK_REQUESTS = os.getenv('SCRAPER_BLOCK_REQUESTS', '1') == '1'
+BLOCKED_RESOURCE_TYPES = frozenset(
+    t.strip() for t in os.getenv('SCRAPER_BLOCKED_RESOURCE_TYPES', 'image,media,font').split(',') if t.strip()
+)
+BLOCKED_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'doubleclick.net',
+    'googlesyndication.com', 'facebook.net', 'connect.facebook.com', 'amazon-adsystem.com',
+    'hotjar.com', 'clarity.ms', 'criteo.com', 'criteo.net', 'scorecardresearch.com',
+    'branch.io', 'moengage.com', 'clevertap-prod.com', 'sentry.io', 'newrelic.com', 'nr-data.net',
+) + tuple(d.strip() for d in os.getenv('SCRAPER_BLOCKED_DOMAINS', '').split(',') if d.strip())
+
+
+def is_blocked_request(resource_type: str, url: str) -> bool:
+    """Check if a browser sub-request should be aborted"""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlsplit(url).hostname or ''
+    return any(host == d or host.endswith('.' + d) for d in BLOCKED_DOMAINS)
+
+
+# ============================================================================
+# BROWSER POOL
+# ============================================================================
+
+class _PooledBrowser:
+    """One long-lived Chromium process shared by several context leases"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser: Optional[Browser] = None
+        self.generation = 0
+        self.pages_served = 0
+        self.active = 0
+        self.lock = asyncio.Lock()
+        self.idle = asyncio.Condition()
+
+    def is_healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+
+class _ContextLease:
+    """Reusable context + page slot bound to one pooled browser"""
+
+    def __init__(self, holder: _PooledBrowser):
+        self.holder = holder
+        self.context: Optional[BrowserContext] = None
+        self.page: Optional[Page] = None
+        self.generation = -1
+        self.pages_served = 0
+
+    async def close(self):
+        if self.context is not None:
+            try:
+                await self.context.close()
+            except Exception:
+                pass
+        self.context = None
+        self.page = None
+
+
+class BrowserPool:
+    """Fixed set of headless browsers with recycled contexts and pages"""
+
+    def __init__(self, playwright: Playwright, size: int = POOL_SIZE,
+                 contexts_per_browser: int = CONTEXTS_PER_BROWSER,
+                 pages_per_context: int = PAGES_PER_CONTEXT,
+                 pages_per_browser: int = PAGES_PER_BROWSER):
+        self._playwright = playwright
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.pages_per_context = pages_per_context
+        self.pages_per_browser = pages_per_browser
+
+        self._browsers: List[_PooledBrowser] = []
+        self._leases: List[_ContextLease] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self.restarts = 0
+        self.context_recycles = 0
+        self.blocked_requests = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.contexts_per_browser
+
+    async def start(self):
+        """Launch all browsers and queue their context slots"""
+        self._idle = asyncio.Queue()
+        for i in range(self.size):
+            holder = _PooledBrowser(i)
+            await self._launch(holder)
+            self._browsers.append(holder)
+            for _ in range(self.contexts_per_browser):
+                lease = _ContextLease(holder)
+                self._leases.append(lease)
+                self._idle.put_nowait(lease)
+        print(f"🧭 Browser pool ready: {self.size} browsers x {self.contexts_per_browser} contexts "
+              f"(at most {self.capacity} pages rendering at once)")
+
+    async def close(self):
+        for lease in self._leases:
+            await lease.close()
+        for holder in self._browsers:
+            if holder.browser is not None:
+                try:
+                    await holder.browser.close()
+                except Exception:
+                    pass
+                holder.browser = None
+
+    async def _launch(self, holder: _PooledBrowser):
+        if holder.browser is not None:
+            try:
+                await holder.browser.close()
+            except Exception:
+                pass
+        holder.browser = await self._playwright.chromium.launch(headless=True)
+        holder.generation += 1
+        holder.pages_served = 0
+
+    async def _ensure_browser(self, holder: _PooledBrowser):
+        """Health check: relaunch crashed browsers, drain and recycle worn-out ones"""
+        if holder.is_healthy() and holder.pages_served < self.pages_per_browser:
+            return
+
+        async with holder.lock:
+            if holder.is_healthy() and holder.pages_served < self.pages_per_browser:
+                return
+
+            if holder.is_healthy():
+                # Recycle after N pages - wait for in-flight pages on this browser to finish
+                async with holder.idle:
+                    await holder.idle.wait_for(lambda: holder.active == 0)
+                print(f"   ♻️ Recycling browser {holder.index} after {holder.pages_served} pages")
+            else:
+                print(f"   🩺 Browser {holder.index} unhealthy, relaunching")
+
+            await self._launch(holder)
+            self.restarts += 1
+
+    async def _ensure_context(self, lease: _ContextLease):
+        holder = lease.holder
+        stale = (
+            lease.context is None
+            or lease.generation != holder.generation
+            or lease.pages_served >= self.pages_per_context
+            or lease.page is None
+            or lease.page.is_closed()
+        )
+        if not stale:
+            return
+
+        if lease.context is not None:
+            self.context_recycles += 1
+        await lease.close()
+        lease.context = await holder.browser.new_context(viewport=VIEWPORT, user_agent=USER_AGENT)
+        if BLOCK_REQUESTS:
+            await lease.context.route('**/*', self._route_request)
+        lease.page = await lease.context.new_page()
+        lease.generation = holder.generation
+        lease.pages_served = 0
+
+    async def _route_request(self, route: Route):
+        request = route.request
+        if is_blocked_request(request.resource_type, request.url):
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a ready page from the pool"""
+        lease = await self._idle.get()
+        holder = lease.holder
+        failed = False
+        try:
+            await self._ensure_browser(holder)
+            await self._ensure_context(lease)
+            holder.active += 1
+        except Exception:
+            await lease.close()
+            self._idle.put_nowait(lease)
+            raise
+
+        try:
+            yield lease.page
+        except BaseException:
+            # Includes cancellation - a half-loaded page must not be reused as-is
+            failed = True
+            raise
+        finally:
+            lease.pages_served += 1
+            holder.pages_served += 1
+            if failed:
+                # Throw away the context after an error so the next borrower starts clean
+                await lease.close()
+            async with holder.idle:
+                holder.active -= 1
+                holder.idle.notify_all()
+            self._idle.put_nowait(lease)
+
+    def stats(self) -> Dict:
+        return {
+            'browsers': self.size,
+            'healthy_browsers': sum(1 for b in self._browsers if b.is_healthy()),
+            'capacity': self.capacity,
+            'idle': self._idle.qsize() if self._idle else 0,
+            'pages_served': sum(b.pages_served for b in self._browsers),
+            'browser_restarts': self.restarts,
+            'context_recycles': self.context_recycles,
+            'blocked_requests': self.blocked_requests,
+        }
+
+
+# ============================================================================
+# RUNTIME (BACKGROUND EVENT LOOP)
+# ============================================================================
+
+class BrowserRuntime:
+    """Owns Playwright and the browser pool on a dedicated event loop thread"""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='browser-pool', daemon=True)
+        self._thread.start()
+        self._playwright: Optional[Playwright] = None
+        self.pool: BrowserPool = self.run(self._start(pool_size))
+
+    async def _start(self, pool_size: int) -> BrowserPool:
+        self._playwright = await async_playwright().start()
+        pool = BrowserPool(self._playwright, size=pool_size)
+        await pool.start()
+        return pool
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the pool loop from synchronous code"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def submit(self, coro):
+        """Await a coroutine on the pool loop from any event loop"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def _stop(self):
+        await self.pool.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    def shutdown(self):
+        try:
+            self.run(self._stop(), timeout=30)
+        except Exception as e:
+            print(f"   ⚠️ Browser pool shutdown error: {str(e)[:50]}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_runtime: Optional[BrowserRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> BrowserRuntime:
+    """Return the process-wide browser runtime, starting it on first use"""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = BrowserRuntime()
+    return _runtime
+
+
+def shutdown_runtime():
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None:
+            _runtime.shutdown()
+            _runtime = None
+
+
+atexit.register(shutdown_runtime)
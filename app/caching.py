@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+# ============================================================================
+# IN-MEMORY TTL CACHE
+# ============================================================================
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# ============================================================================
+# PERSISTENT EXTRACTION CACHE (SQLITE)
+# ============================================================================
+
+class ExtractionCache:
+    """
+    Content-addressed, persistent cache for LLM extraction results
+
+    Entries expire after `ttl` seconds; once the cache holds more than
+    `max_entries` rows or `max_bytes` of payload, least recently used rows
+    are evicted. Values are JSON (None is cached too - a page the model
+    rejected costs as much as one it accepted).
+    """
+
+    MISS = object()
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 50000, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS extraction_cache ('
+                ' key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,'
+                ' created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_extraction_accessed ON extraction_cache(accessed_at)')
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8', 'replace'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, key: str, default: Any = MISS) -> Any:
+        """Return the cached value, or `default` (ExtractionCache.MISS) on a miss"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT value, created_at FROM extraction_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] + self.ttl < now:
+                if row is not None:
+                    conn.execute('DELETE FROM extraction_cache WHERE key = ?', (key,))
+                    conn.commit()
+                self.misses += 1
+                return default
+            conn.execute('UPDATE extraction_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO extraction_cache (key, value, size, created_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (key, payload, len(payload), now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute('DELETE FROM extraction_cache WHERE created_at < ?', (now - self.ttl,)).rowcount
+        count, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache').fetchone()
+        evicted = 0
+        while count > self.max_entries or size > self.max_bytes:
+            batch = max(count - self.max_entries, 1, count // 20)
+            rows = conn.execute(
+                'SELECT key, size FROM extraction_cache ORDER BY accessed_at LIMIT ?', (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany('DELETE FROM extraction_cache WHERE key = ?', [(r[0],) for r in rows])
+            count -= len(rows)
+            size -= sum(r[1] for r in rows)
+            evicted += len(rows)
+        self.evictions += expired + evicted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, size = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache'
+            ).fetchone()
+            total = self.hits + self.misses
+            return {
+                'entries': count,
+                'bytes': size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
@@ -0,0 +1,77 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+
+# ============================================================================
+# URL CANONICALIZATION
+# ============================================================================
+# Search returns one product under many URLs (ref tags, tracking params,
+# /dp/ vs /gp/product/, size variants). Each URL is mapped to a stable
+# per-site product key so a product is fetched and extracted at most once.
+
+AMAZON_ASIN_RE = re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?:[/?]|$)', re.I)
+FLIPKART_ITEM_RE = re.compile(r'/p/(itm[a-z0-9]+)', re.I)
+MYNTRA_STYLE_RE = re.compile(r'/(\d{5,})/buy(?:[/?]|$)', re.I)
+RELIANCE_ITEM_RE = re.compile(r'/p/(\d{6,})', re.I)
+
+
+def _site(host: str) -> Optional[str]:
+    for site in ('amazon', 'flipkart', 'myntra', 'reliancedigital'):
+        if site in host:
+            return site
+    return None
+
+
+def canonicalize_url(url: str) -> Tuple[str, Optional[str]]:
+    """(clean product URL, stable product key) - key is None when no product id is found"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    site = _site(host)
+    path = parts.path
+
+    if site == 'amazon':
+        match = AMAZON_ASIN_RE.search(path + '/')
+        if match:
+            asin = match.group(1).upper()
+            return urlunsplit(('https', host, f'/dp/{asin}', '', '')), f'amazon:{asin}'
+    elif site == 'flipkart':
+        match = FLIPKART_ITEM_RE.search(path)
+        pid = parse_qs(parts.query).get('pid', [None])[0]
+        if match or pid:
+            # Size/colour variants share the item id; pid picks the variant search matched
+            query = f'pid={pid}' if pid else ''
+            host = host.replace('dl.flipkart.com', 'www.flipkart.com')
+            key = f'flipkart:{match.group(1).lower()}' if match else f'flipkart:{pid.upper()}'
+            return urlunsplit(('https', host, path.replace('/dl/', '/', 1), query, '')), key
+    elif site == 'myntra':
+        match = MYNTRA_STYLE_RE.search(path)
+        if match:
+            return urlunsplit(('https', host, path.rstrip('/'), '', '')), f'myntra:{match.group(1)}'
+    elif site == 'reliancedigital':
+        match = RELIANCE_ITEM_RE.search(path)
+        if match:
+            return urlunsplit(('https', host, path.rstrip('/'), '', '')), f'reliancedigital:{match.group(1)}'
+
+    # Unknown layout: keep the path, drop query (tracking) and fragment
+    return urlunsplit((parts.scheme or 'https', host, path.rstrip('/') or '/', '', '')), None
+
+
+def product_key(url: str) -> str:
+    """Stable key for a product URL (falls back to the cleaned URL)"""
+    clean, key = canonicalize_url(url)
+    return key or f'url:{clean}'
+
+
+def dedupe_urls(items: List[Dict]) -> List[Dict]:
+    """Canonicalize {'url', ...} items in place order, keeping the first per product key"""
+    seen = set()
+    unique = []
+    for item in items:
+        clean, key = canonicalize_url(item['url'])
+        key = key or f'url:{clean}'
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append({**item, 'url': clean, 'key': key})
+    return unique
@@ -0,0 +1,148 @@
+import hashlib
+import re
+import struct
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from app.canonical import product_key
+
+
+# ============================================================================
+# NEAR-DUPLICATE PRODUCT DETECTION
+# ============================================================================
+# Names are turned into word shingles and summarised by a MinHash signature.
+# LSH banding buckets signatures so each insert only compares against the few
+# products sharing a band (or the same image), not the whole list. Candidates
+# are then confirmed on exact name similarity, price and colour. In
+# cross-site mode, listings from different stores skip the price check - the
+# same product is routinely priced more than PRICE_TOLERANCE apart between
+# them - and match on name and image alone.
+
+NUM_PERM = 64
+BANDS = 16                     # 16 bands x 4 rows ≈ 0.5 Jaccard candidate threshold
+NAME_THRESHOLD = 0.7           # Jaccard for a duplicate on name alone
+IMAGE_NAME_THRESHOLD = 0.4     # ...when both listings use the same image
+PRICE_TOLERANCE = 0.05
+
+# One SHAKE-128 read per word yields all NUM_PERM 32-bit hash values at once
+_HASH_FORMAT = struct.Struct(f'<{NUM_PERM}I')
+_word_hashes: Dict[str, Tuple[int, ...]] = {}
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+# Filler that sellers and sites append or reorder freely
+STOP_WORDS = frozenset((
+    'for', 'the', 'and', 'with', 'of', 'in', 'a', 'an', 'by', 'buy', 'online', 'india',
+    'pack', 'pair', 'new', 'latest', 'original', 'store', 'seller', 'retail', 'official',
+))
+# Size/format modifier in Amazon image file names (71abc._AC_UL320_.jpg); Flipkart and
+# Myntra put sizes in directories, which the file-name key already ignores
+AMAZON_IMAGE_VARIANT_RE = re.compile(r'\._[^/]*?_\.')
+
+
+def name_shingles(name: str) -> Set[str]:
+    """Word set of a normalised product name (order-insensitive)"""
+    return {w for w in WORD_RE.findall((name or '').lower()) if w not in STOP_WORDS}
+
+
+def _hashes(word: str) -> Tuple[int, ...]:
+    hashes = _word_hashes.get(word)
+    if hashes is None:
+        hashes = _HASH_FORMAT.unpack(hashlib.shake_128(word.encode()).digest(_HASH_FORMAT.size))
+        if len(_word_hashes) < 100000:
+            _word_hashes[word] = hashes
+    return hashes
+
+
+def minhash(shingles: Set[str]) -> Tuple[int, ...]:
+    """NUM_PERM-value MinHash signature of a non-empty shingle set"""
+    return tuple(map(min, zip(*(_hashes(s) for s in shingles))))
+
+
+def image_key(url: Optional[str]) -> Optional[str]:
+    """Image file name with host, query, directories and size variants stripped"""
+    if not url or not url.startswith('http') or 'placeholder' in url:
+        return None
+    name = urlsplit(url).path.rsplit('/', 1)[-1]
+    return AMAZON_IMAGE_VARIANT_RE.sub('.', name) or None
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _prices_close(a, b) -> bool:
+    try:
+        a, b = float(a or 0), float(b or 0)
+    except (TypeError, ValueError):
+        return True
+    if a <= 0 or b <= 0:
+        return True
+    return abs(a - b) / max(a, b) <= PRICE_TOLERANCE
+
+
+def _colours_differ(a, b) -> bool:
+    a, b = str(a or '').strip().lower(), str(b or '').strip().lower()
+    return bool(a and b and a != 'unknown' and b != 'unknown' and a != b)
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index of products; `add` returns False for a near-duplicate"""
+
+    def __init__(self, bands: int = BANDS, cross_site: bool = False):
+        self.cross_site = cross_site
+        self.rows = NUM_PERM // bands
+        self.bands = bands
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._images: Dict[str, List[int]] = defaultdict(list)
+        self._keys: Set[str] = set()
+        self._items: List[Tuple[Set[str], Optional[str], Dict]] = []
+        self.comparisons = 0
+
+    def _candidates(self, signature: Tuple[int, ...], image: Optional[str]) -> Set[int]:
+        found = set()
+        for band, buckets in enumerate(self._buckets):
+            found.update(buckets.get(signature[band * self.rows:(band + 1) * self.rows], ()))
+        if image:
+            found.update(self._images.get(image, ()))
+        return found
+
+    def is_duplicate_of(self, shingles: Set[str], image: Optional[str], product: Dict, other: int) -> bool:
+        other_shingles, other_image, other_product = self._items[other]
+        self.comparisons += 1
+        if _colours_differ(product.get('colour'), other_product.get('colour')):
+            return False
+        other_store = self.cross_site and product.get('source_website') != other_product.get('source_website')
+        if not other_store and not _prices_close(product.get('price'), other_product.get('price')):
+            return False
+        similarity = jaccard(shingles, other_shingles)
+        same_image = image is not None and image == other_image
+        return similarity >= NAME_THRESHOLD or (same_image and similarity >= IMAGE_NAME_THRESHOLD)
+
+    def add(self, product: Dict) -> bool:
+        url = product.get('product_url') or ''
+        if url and url != '#':
+            key = product_key(url)
+            if key in self._keys:
+                return False
+        else:
+            key = None
+
+        shingles = name_shingles(product.get('name', ''))
+        image = image_key(product.get('image_url'))
+        signature = minhash(shingles) if shingles else None
+        if signature is not None or image:
+            candidates = self._candidates(signature, image) if signature else set(self._images.get(image, ()))
+            if any(self.is_duplicate_of(shingles, image, product, other) for other in candidates):
+                return False
+
+        index = len(self._items)
+        self._items.append((shingles, image, product))
+        if key:
+            self._keys.add(key)
+        if signature is not None:
+            for band, buckets in enumerate(self._buckets):
+                buckets[signature[band * self.rows:(band + 1) * self.rows]].append(index)
+        if image:
+            self._images[image].append(index)
+        return True
@@ -0,0 +1,359 @@
+import json
+import re
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+import lxml.html
+from lxml import etree
+
+
+# ============================================================================
+# STRUCTURED-DATA EXTRACTORS
+# ============================================================================
+# Deterministic product extraction from JSON-LD, OpenGraph/meta tags and
+# per-site embedded state / server-rendered markup. Every extractor returns a
+# partial product dict in the same shape the LLM prompt asks for; fields it
+# cannot find are simply left out.
+
+REQUIRED_FIELDS = ('name', 'brand', 'price')
+PRODUCT_FIELDS = (
+    'name', 'brand', 'price', 'original_price', 'discount', 'image_url', 'rating',
+    'reviews', 'gender', 'size', 'colour', 'category', 'in_stock', 'availability_status',
+)
+
+NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+MYNTRA_STATE_RE = re.compile(r'window\.__myx\s*=\s*(\{.*?\})\s*;?\s*</script>', re.S)
+
+
+def _number(value) -> Optional[float]:
+    """Parse '₹1,299.00', 1299 or '4.3 out of 5' into a float"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER_RE.search(str(value).replace(',', ''))
+    return float(match.group()) if match else None
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _joined(value) -> Optional[str]:
+    """Schema.org text properties may be lists - one comma-separated string"""
+    if isinstance(value, list):
+        return ', '.join(str(v) for v in value if v not in (None, '')) or None
+    return str(value) if value not in (None, '') else None
+
+
+def _text(tree, xpath: str) -> Optional[str]:
+    for node in tree.xpath(xpath):
+        text = node if isinstance(node, str) else node.text_content()
+        text = ' '.join(text.split())
+        if text:
+            return text
+    return None
+
+
+def _stock_from_text(text: Optional[str]) -> Optional[Dict]:
+    if not text:
+        return None
+    lower = text.lower()
+    if any(k in lower for k in ('out of stock', 'currently unavailable', 'sold out', 'notify me')):
+        return {'in_stock': False, 'availability_status': 'out_of_stock'}
+    if re.search(r'only \d+ left', lower) or 'limited stock' in lower:
+        return {'in_stock': True, 'availability_status': 'limited_stock'}
+    if 'in stock' in lower:
+        return {'in_stock': True, 'availability_status': 'in_stock'}
+    return None
+
+
+def _schema_stock(availability: str) -> Optional[Dict]:
+    value = str(availability or '').rsplit('/', 1)[-1].lower()
+    if value in ('outofstock', 'soldout', 'discontinued'):
+        return {'in_stock': False, 'availability_status': 'out_of_stock'}
+    if value in ('limitedavailability',):
+        return {'in_stock': True, 'availability_status': 'limited_stock'}
+    if value in ('instock', 'onlineonly', 'instoreonly', 'preorder'):
+        return {'in_stock': True, 'availability_status': 'in_stock'}
+    return None
+
+
+def _clean(product: Dict) -> Dict:
+    """Drop empty values so later extractors can fill them"""
+    return {k: v for k, v in product.items() if v not in (None, '', [], {})}
+
+
+# ============================================================================
+# GENERIC LAYERS: JSON-LD & OPENGRAPH
+# ============================================================================
+
+def iter_json_ld(tree) -> Iterator[Dict]:
+    """Yield every JSON-LD object on the page, flattening lists and @graph"""
+    for raw in tree.xpath('//script[@type="application/ld+json"]/text()'):
+        try:
+            data = json.loads(raw.strip(), strict=False)
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            item = stack.pop(0)
+            if not isinstance(item, dict):
+                continue
+            if '@graph' in item:
+                stack.extend(item['@graph'] if isinstance(item['@graph'], list) else [item['@graph']])
+                continue
+            yield item
+
+
+def extract_json_ld(tree) -> Dict:
+    """Schema.org Product → product dict"""
+    for item in iter_json_ld(tree):
+        types = item.get('@type')
+        types = types if isinstance(types, list) else [types]
+        if not any(t in ('Product', 'ProductGroup', 'IndividualProduct') for t in types):
+            continue
+
+        product = {'name': item.get('name')}
+
+        brand = _first(item.get('brand'))
+        product['brand'] = brand.get('name') if isinstance(brand, dict) else brand
+
+        offers = item.get('offers')
+        offers = _first(offers) if isinstance(offers, list) else offers
+        if isinstance(offers, dict):
+            product['price'] = _number(offers.get('price') or offers.get('lowPrice'))
+            high = _number(offers.get('highPrice'))
+            if high and product['price'] and high > product['price']:
+                product['original_price'] = high
+            product.update(_schema_stock(offers.get('availability')) or {})
+
+        image = _first(item.get('image'))
+        product['image_url'] = image.get('url') if isinstance(image, dict) else image
+
+        rating = item.get('aggregateRating')
+        if isinstance(rating, dict):
+            product['rating'] = _number(rating.get('ratingValue'))
+            reviews = _number(rating.get('reviewCount') or rating.get('ratingCount'))
+            product['reviews'] = int(reviews) if reviews is not None else None
+
+        audience = item.get('audience')
+        if isinstance(audience, dict):
+            product['gender'] = audience.get('suggestedGender')
+
+        product['colour'] = _joined(item.get('color'))
+        product['size'] = _joined(item.get('size'))
+        product['category'] = item.get('category') if isinstance(item.get('category'), str) else None
+        return _clean(product)
+    return {}
+
+
+def extract_meta_tags(tree) -> Dict:
+    """OpenGraph / product:* meta tags → product dict"""
+    meta = {}
+    for node in tree.xpath('//meta[@content]'):
+        key = (node.get('property') or node.get('name') or node.get('itemprop') or '').lower()
+        if key and key not in meta:
+            meta[key] = node.get('content', '').strip()
+
+    product = {
+        'name': meta.get('og:title') or meta.get('twitter:title'),
+        'brand': meta.get('product:brand') or meta.get('og:brand'),
+        'price': _number(meta.get('product:price:amount') or meta.get('og:price:amount') or meta.get('price')),
+        'image_url': meta.get('og:image') or meta.get('twitter:image'),
+        'colour': meta.get('product:color'),
+        'gender': meta.get('product:target_gender'),
+        'category': meta.get('product:category'),
+    }
+    product.update(_schema_stock(meta.get('product:availability') or meta.get('og:availability')) or {})
+    return _clean(product)
+
+
+# ============================================================================
+# PER-SITE EXTRACTORS
+# ============================================================================
+
+SiteExtractor = Callable[[object, str], Dict]
+SITE_EXTRACTORS: Dict[str, SiteExtractor] = {}
+
+
+def register_extractor(site: str):
+    """Register the embedded-state / markup extractor for a WEBSITES key"""
+    def decorator(func: SiteExtractor) -> SiteExtractor:
+        SITE_EXTRACTORS[site] = func
+        return func
+    return decorator
+
+
+@register_extractor('myntra')
+def extract_myntra(tree, html: str) -> Dict:
+    match = MYNTRA_STATE_RE.search(html)
+    if not match:
+        return {}
+    try:
+        pdp = json.loads(match.group(1), strict=False).get('pdpData') or {}
+    except ValueError:
+        return {}
+
+    price = pdp.get('price') or {}
+    brand = pdp.get('brand') or {}
+    ratings = pdp.get('ratings') or {}
+    albums = (pdp.get('media') or {}).get('albums') or [{}]
+    images = albums[0].get('images') or [{}]
+    sizes = pdp.get('sizes') or []
+    available = [s.get('label') for s in sizes if s.get('available')]
+
+    product = {
+        'name': pdp.get('name'),
+        'brand': brand.get('name') if isinstance(brand, dict) else brand,
+        'price': _number(price.get('discounted') or price.get('mrp')),
+        'original_price': _number(price.get('mrp')),
+        'discount': _number((price.get('discount') or {}).get('discountPercent')) if isinstance(price.get('discount'), dict) else None,
+        'image_url': images[0].get('imageURL') or images[0].get('src'),
+        'rating': _number(ratings.get('averageRating')),
+        'reviews': int(ratings['totalCount']) if isinstance(ratings.get('totalCount'), int) else None,
+        'gender': pdp.get('gender'),
+        'colour': pdp.get('baseColour'),
+        'category': (pdp.get('analytics') or {}).get('articleType'),
+        'size': ', '.join(l for l in available if l) if available else None,
+    }
+    if sizes:
+        in_stock = bool(available)
+        product['in_stock'] = in_stock
+        product['availability_status'] = 'in_stock' if in_stock else 'out_of_stock'
+    return _clean(product)
+
+
+@register_extractor('flipkart')
+def extract_flipkart(tree, html: str) -> Dict:
+    reviews_text = _text(tree, '//span[contains(@class,"Wphh3N") or contains(@class,"_2_R_DZ")]')
+    reviews = re.findall(r'([\d,]+)\s+Reviews', reviews_text or '')
+    product = {
+        'name': _text(tree, '//span[contains(@class,"VU-ZEz") or contains(@class,"B_NuCI")]'),
+        'brand': _text(tree, '//span[contains(@class,"mEh187") or contains(@class,"G6XhRU")]'),
+        'price': _number(_text(tree, '//div[contains(@class,"Nx9bqj") or contains(@class,"_30jeq3")]')),
+        'original_price': _number(_text(tree, '//div[contains(@class,"yRaY8j") or contains(@class,"_3I9_wc")]')),
+        'discount': _number(_text(tree, '//div[contains(@class,"UkUFwK") or contains(@class,"_3Ay6Sb")]')),
+        'rating': _number(_text(tree, '//div[contains(@class,"XQDdHH") or contains(@class,"_3LWZlK")]')),
+        'reviews': int(reviews[0].replace(',', '')) if reviews else None,
+        'image_url': _text(tree, '//img[contains(@class,"DByuf4") or contains(@class,"_396cs4")]/@src'),
+    }
+    product.update(_stock_from_text(_text(tree, '//div[contains(@class,"Z8JjpR") or contains(@class,"_16FRp0")]')) or {})
+    return _clean(product)
+
+
+@register_extractor('amazon')
+def extract_amazon(tree, html: str) -> Dict:
+    byline = _text(tree, '//*[@id="bylineInfo"]') or ''
+    brand = re.sub(r'^(visit the|brand:)\s*|\s*store$', '', byline, flags=re.I).strip()
+    rating = _text(tree, '//*[@id="acrPopover"]/@title')
+    image = tree.xpath('//img[@id="landingImage"]')
+    product = {
+        'name': _text(tree, '//*[@id="productTitle"]'),
+        'brand': brand or None,
+        'price': _number(_text(tree, '//*[@id="corePrice_feature_div"]//span[@class="a-offscreen"]'
+                                     ' | //span[contains(@class,"priceToPay")]//span[@class="a-offscreen"]'
+                                     ' | //*[@id="priceblock_ourprice"]')),
+        'original_price': _number(_text(tree, '//span[contains(@class,"basisPrice")]//span[@class="a-offscreen"]'
+                                              ' | //span[@data-a-strike="true"]//span[@class="a-offscreen"]')),
+        'rating': _number(rating),
+        'reviews': int(_number(_text(tree, '//*[@id="acrCustomerReviewText"]')) or 0) or None,
+        'image_url': (image[0].get('data-old-hires') or image[0].get('src')) if image else None,
+    }
+    product.update(_stock_from_text(_text(tree, '//*[@id="availability"]')) or {})
+    return _clean(product)
+
+
+@register_extractor('reliancedigital')
+def extract_reliancedigital(tree, html: str) -> Dict:
+    product = {
+        'name': _text(tree, '//h1[contains(@class,"pdp__title")]'),
+        'price': _number(_text(tree, '//*[contains(@class,"pdp__offerPrice")]')),
+        'original_price': _number(_text(tree, '//*[contains(@class,"pdp__mrp")]')),
+    }
+    product.update(_stock_from_text(_text(tree, '//*[contains(@class,"pdp__outOfStock")]')) or {})
+    return _clean(product)
+
+
+# ============================================================================
+# COVERAGE COUNTERS
+# ============================================================================
+
+class ExtractorCoverage:
+    """Per-site counts of pages, structured-only extractions and LLM fallbacks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sites: Dict[str, Dict] = {}
+
+    def record(self, site: Optional[str], product: Dict, complete: bool):
+        with self._lock:
+            entry = self.sites.setdefault(site or 'other', {
+                'pages': 0, 'structured': 0, 'llm_fallback': 0,
+                'fields': {f: 0 for f in PRODUCT_FIELDS},
+            })
+            entry['pages'] += 1
+            entry['structured' if complete else 'llm_fallback'] += 1
+            for field in PRODUCT_FIELDS:
+                if field in product:
+                    entry['fields'][field] += 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                site: {
+                    **{k: v for k, v in entry.items() if k != 'fields'},
+                    'coverage': round(entry['structured'] / entry['pages'], 3) if entry['pages'] else 0.0,
+                    'field_rates': {f: round(n / entry['pages'], 3) for f, n in entry['fields'].items()},
+                }
+                for site, entry in self.sites.items()
+            }
+
+    def report(self):
+        for site, entry in sorted(self.summary().items()):
+            weakest = sorted(entry['field_rates'].items(), key=lambda kv: kv[1])[:3]
+            fields = ', '.join(f"{f} {rate:.0%}" for f, rate in weakest)
+            print(f"   🧩 Extractors [{site}]: {entry['structured']}/{entry['pages']} pages without LLM "
+                  f"({entry['coverage']:.0%}), least found: {fields}")
+
+
+EXTRACTOR_COVERAGE = ExtractorCoverage()
+
+
+# ============================================================================
+# ENTRY POINT
+# ============================================================================
+
+def missing_fields(product: Dict, required=REQUIRED_FIELDS) -> List[str]:
+    return [f for f in required if not product.get(f)]
+
+
+def extract_structured_product(html: str, site: Optional[str]) -> Dict:
+    """Merge site-specific, JSON-LD and meta extractors (earlier wins per field)"""
+    try:
+        tree = lxml.html.fromstring(html)
+    except (ValueError, etree.ParserError):
+        return {}
+
+    product: Dict = {}
+    layers = []
+    if site in SITE_EXTRACTORS:
+        layers.append(lambda: SITE_EXTRACTORS[site](tree, html))
+    layers.append(lambda: extract_json_ld(tree))
+    layers.append(lambda: extract_meta_tags(tree))
+
+    for layer in layers:
+        try:
+            found = layer()
+        except Exception as e:
+            print(f"   ⚠️ Extractor error ({site}): {str(e)[:50]}")
+            continue
+        for key, value in found.items():
+            product.setdefault(key, value)
+
+    if product.get('price') and product.get('original_price') and 'discount' not in product:
+        if product['original_price'] > product['price']:
+            product['discount'] = int(round((1 - product['price'] / product['original_price']) * 100))
+    return product
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# ============================================================================
+# HTTP TIER CONFIGURATION
+# ============================================================================
+
+HTTP_FAST_PATH = os.getenv('SCRAPER_HTTP_FAST_PATH', '1') == '1'
+HTTP_TIMEOUT = float(os.getenv('SCRAPER_HTTP_TIMEOUT', '8'))
+HTTP_POOL_SIZE = int(os.getenv('SCRAPER_HTTP_POOL_SIZE', '50'))
+
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-IN,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+# Pages smaller than this are error/interstitial pages, never full product pages
+MIN_PRODUCT_HTML = 5000
+
+# Bot-wall / interstitial markers - such responses never count as product signal.
+# Rendered product pages carry these words in inline JS/CSS and sometimes in their
+# copy, so only the title and the visible text of pages with little text are checked
+BLOCK_MARKERS = (
+    'validatecaptcha', 'robot check', 'px-captcha', 'are you a human',
+    'access denied', 'unusual traffic', 'enter the characters you see',
+)
+BLOCK_PAGE_MAX_TEXT = 3000  # visible characters; bot walls are short, product pages are not
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.I | re.S)
+HIDDEN_RE = re.compile(r'<(script|style|noscript|template|svg)\b.*?</\1\s*>', re.I | re.S)
+TAG_RE = re.compile(r'<[^>]+>')
+
+# Server-rendered markers that show the title and price made it into the raw HTML
+SITE_SIGNALS = {
+    'amazon': [
+        re.compile(r'id="productTitle"'),
+        re.compile(r'class="a-offscreen"|id="priceblock_ourprice"|"priceAmount"'),
+    ],
+    'flipkart': [
+        re.compile(r'class="(?:VU-ZEz|B_NuCI)'),
+        re.compile(r'class="(?:Nx9bqj|_30jeq3)'),
+    ],
+    'myntra': [
+        re.compile(r'"productName"\s*:|class="pdp-title"'),
+        re.compile(r'"mrp"\s*:|class="pdp-price"'),
+    ],
+    'reliancedigital': [
+        re.compile(r'class="pdp__title'),
+        re.compile(r'class="pdp__offerPrice'),
+    ],
+}
+
+JSON_LD_RE = re.compile(r'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+OG_PRICE_RE = re.compile(r'<meta[^>]+property="(?:product|og):price:amount"[^>]+content="[\d.,]+"', re.I)
+
+
+# ============================================================================
+# HTTP CLIENT
+# ============================================================================
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Shared keep-alive session with a connection pool sized for the scraper"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(HTTP_HEADERS)
+                _session = session
+    return _session
+
+
+def fetch_http(url: str, timeout: float = HTTP_TIMEOUT) -> Optional[str]:
+    """Plain GET of a product page, None on any non-200 response"""
+    try:
+        response = get_http_session().get(url, timeout=timeout, allow_redirects=True)
+        if response.status_code != 200:
+            return None
+        return response.text
+    except requests.exceptions.RequestException:
+        return None
+
+
+async def fetch_http_async(url: str, timeout: float = HTTP_TIMEOUT) -> Optional[str]:
+    return await asyncio.to_thread(fetch_http, url, timeout)
+
+
+# ============================================================================
+# PRODUCT SIGNAL CHECK
+# ============================================================================
+
+def is_blocked_page(html: str) -> bool:
+    """Detect captcha / bot-wall responses from the title and visible text"""
+    title = TITLE_RE.search(html)
+    if title and any(marker in title.group(1).lower() for marker in BLOCK_MARKERS):
+        return True
+    markup = HIDDEN_RE.sub(' ', html)
+    text = ' '.join(TAG_RE.sub(' ', markup).split())
+    if len(text) > BLOCK_PAGE_MAX_TEXT:
+        return False
+    # Short page: markers may also sit in form actions / element ids (validateCaptcha, px-captcha)
+    markup, text = markup.lower(), text.lower()
+    return any(marker in text or marker in markup for marker in BLOCK_MARKERS)
+
+
+def _has_json_ld_product(html: str) -> bool:
+    for block in JSON_LD_RE.findall(html):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            item_type = item.get('@type')
+            types = item_type if isinstance(item_type, list) else [item_type]
+            if 'Product' in types and item.get('name') and item.get('offers'):
+                return True
+    return False
+
+
+def has_product_signal(html: Optional[str], site: Optional[str]) -> bool:
+    """Check if raw HTML already carries enough product data to skip the browser"""
+    if not html or len(html) < MIN_PRODUCT_HTML or is_blocked_page(html):
+        return False
+
+    if _has_json_ld_product(html):
+        return True
+
+    patterns = SITE_SIGNALS.get(site or '')
+    if patterns and all(p.search(html) for p in patterns):
+        return True
+
+    return 'og:title' in html and OG_PRICE_RE.search(html) is not None
+
+
+# ============================================================================
+# TIER STATS
+# ============================================================================
+
+class FetchStats:
+    """Per-tier hit counters and timings for the tiered fetcher"""
+
+    TIERS = ('http', 'browser', 'failed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = {tier: 0 for tier in self.TIERS}
+        self.seconds = {tier: 0.0 for tier in self.TIERS}
+        self.escalations = 0
+
+    def record(self, tier: str, seconds: float, escalated: bool = False):
+        with self._lock:
+            self.hits[tier] += 1
+            self.seconds[tier] += seconds
+            if escalated:
+                self.escalations += 1
+
+    def merge(self, other: 'FetchStats'):
+        with self._lock:
+            for tier in self.TIERS:
+                self.hits[tier] += other.hits[tier]
+                self.seconds[tier] += other.seconds[tier]
+            self.escalations += other.escalations
+
+    def summary(self) -> Dict:
+        with self._lock:
+            total = sum(self.hits.values())
+            browser_hits = self.hits['browser']
+            avg_browser = self.seconds['browser'] / browser_hits if browser_hits else 0.0
+            avg_http = self.seconds['http'] / self.hits['http'] if self.hits['http'] else 0.0
+            return {
+                'total': total,
+                'hits': dict(self.hits),
+                'hit_rates': {tier: round(self.hits[tier] / total, 3) if total else 0.0 for tier in self.TIERS},
+                'escalations': self.escalations,
+                'avg_seconds': {'http': round(avg_http, 2), 'browser': round(avg_browser, 2)},
+                # Every HTTP hit is a page the browser would otherwise have rendered
+                'est_browser_seconds_saved': round(self.hits['http'] * max(avg_browser - avg_http, 0.0), 1),
+            }
+
+    def report(self):
+        s = self.summary()
+        rates = s['hit_rates']
+        print(f"   📶 Fetch tiers: http {s['hits']['http']} ({rates['http']:.0%}), "
+              f"browser {s['hits']['browser']} ({rates['browser']:.0%}), failed {s['hits']['failed']} "
+              f"- ~{s['est_browser_seconds_saved']}s browser time saved")
+
+
+FETCH_STATS = FetchStats()
@@ -0,0 +1,117 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.scheduler import domain_scheduler
+
+
+# ============================================================================
+# HEDGED PAGE LOADS
+# ============================================================================
+# A browser load that runs past the domain's recent fetch latency percentile
+# (domain_scheduler's, so both see the same samples) gets a duplicate attempt on another pooled context; whichever finishes first with
+# HTML wins and the other is cancelled. Hedges are capped to a fraction of
+# all loads (plus a small burst) and a concurrency limit, so a slow site
+# can't double the load on it.
+
+HEDGE_ENABLED = os.getenv('SCRAPER_HEDGE', '1') == '1'
+HEDGE_PERCENTILE = float(os.getenv('SCRAPER_HEDGE_PERCENTILE', '90'))
+HEDGE_MIN_SAMPLES = int(os.getenv('SCRAPER_HEDGE_MIN_SAMPLES', '10'))
+HEDGE_MIN_DELAY = float(os.getenv('SCRAPER_HEDGE_MIN_DELAY', '2'))
+HEDGE_BUDGET = float(os.getenv('SCRAPER_HEDGE_BUDGET', '0.1'))      # hedges per load
+HEDGE_BURST = int(os.getenv('SCRAPER_HEDGE_BURST', '3'))
+HEDGE_MAX_CONCURRENT = int(os.getenv('SCRAPER_HEDGE_MAX_CONCURRENT', '3'))
+
+
+def _discard(task: asyncio.Task):
+    """Cancel a losing attempt; its pooled page is cleaned up by the pool"""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class HedgeController:
+    """Per-domain hedge thresholds and the global hedge budget"""
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, budget: float = HEDGE_BUDGET,
+                 burst: int = HEDGE_BURST, max_concurrent: int = HEDGE_MAX_CONCURRENT):
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.loads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.denied = 0
+        self.active = 0
+
+    def threshold(self, url: str) -> Optional[float]:
+        """Seconds after which a load of this URL is hedged; None until enough samples exist"""
+        value = domain_scheduler.latency_percentile(url, self.percentile, min_samples=HEDGE_MIN_SAMPLES)
+        return None if value is None else max(value, HEDGE_MIN_DELAY)
+
+    def try_start(self) -> bool:
+        if self.active >= self.max_concurrent or self.hedges >= self.loads * self.budget + self.burst:
+            self.denied += 1
+            return False
+        self.hedges += 1
+        self.active += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            'loads': self.loads,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'denied': self.denied,
+        }
+
+    async def run(self, url: str, attempt: Callable[[], Awaitable[str]],
+                  can_hedge: Callable[[], bool] = lambda: True,
+                  hedge_attempt: Optional[Callable[[], Awaitable[str]]] = None) -> str:
+        """
+        Run `attempt`, hedging it with a second one if it is slower than the threshold
+
+        `hedge_attempt` (default: `attempt`) starts the duplicate - e.g. one that
+        takes its own politeness slot rather than sharing the primary's.
+        """
+        self.loads += 1
+        threshold = self.threshold(url) if HEDGE_ENABLED else None
+        primary = asyncio.ensure_future(attempt())
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait({primary}, timeout=threshold)
+                if not done and can_hedge() and self.try_start():
+                    try:
+                        return await self._race(url, primary, hedge_attempt or attempt)
+                    finally:
+                        self.active -= 1
+            html = await primary
+        except BaseException:
+            # Includes cancellation of the caller - never leave an attempt running
+            if not primary.done():
+                _discard(primary)
+            raise
+        return html
+
+    async def _race(self, url: str, primary: asyncio.Task, attempt) -> str:
+        print(f"   🏎️ Hedging slow load (> {self.threshold(url):.1f}s): {url[:60]}")
+        hedge = asyncio.ensure_future(attempt())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    _discard(task)
+
+
+hedge_controller = HedgeController()
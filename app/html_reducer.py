@@ -0,0 +1,221 @@
+import json
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+
+# ============================================================================
+# TOKEN-BUDGETED HTML REDUCER
+# ============================================================================
+# Turns a rendered product page into compact plain text for the LLM:
+#   - page title / h1 and structured data (meta tags, JSON-LD) as key: value lines
+#   - product-relevant sections ranked by signal, rendered as collapsed text
+#     (tables and definition lists become key: value lines)
+#   - product images as "IMG: <src>" lines - every other attribute is dropped
+# Output stops at the token budget (~4 characters per token).
+
+DEFAULT_MAX_TOKENS = 6000
+CHARS_PER_TOKEN = 4
+MAX_IMAGES = 5
+
+DROP_TAGS = ('script', 'style', 'noscript', 'svg', 'iframe', 'nav', 'footer', 'header',
+             'link', 'form', 'button', 'select', 'option', 'canvas', 'video', 'audio', 'template')
+BLOCK_TAGS = frozenset(('div', 'section', 'article', 'main', 'aside', 'p', 'ul', 'ol', 'li', 'table',
+                        'tr', 'dl', 'dt', 'dd', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'hr'))
+SECTION_TAGS = ('div', 'section', 'article', 'main', 'table', 'ul', 'dl')
+
+CLASS_SIGNAL_RE = re.compile(r'product|pdp|detail|price|info|item|spec|feature|rating|review|size|colou?r|stock|offer', re.I)
+TEXT_SIGNAL_RE = re.compile(
+    r'₹|\brs\.?\s*\d|\bmrp\b|\bprice\b|% off|add to (?:cart|bag)|buy now|out of stock|in stock|'
+    r'currently unavailable|notify me|only \d+ left|\bsize\b|\bcolou?r\b|ratings?\b|reviews?\b|'
+    r'\bbrand\b|material|specification|\bdelivery\b',
+    re.I
+)
+IMAGE_HINT_RE = re.compile(r'product|pdp|gallery|landing|main|zoom|hero|image', re.I)
+WS_RE = re.compile(r'\s+')
+
+META_KEYS = ('og:title', 'og:description', 'og:image', 'product:brand', 'product:price:amount',
+             'og:price:amount', 'product:availability', 'product:color', 'product:category', 'description')
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+# lxml parser objects must not be used by two threads at once - one per thread
+_local = threading.local()
+
+
+def _parser() -> etree.HTMLParser:
+    if not hasattr(_local, 'parser'):
+        _local.parser = etree.HTMLParser(remove_comments=True, remove_pis=True)
+    return _local.parser
+
+
+def _collapse(text: Optional[str]) -> str:
+    return WS_RE.sub(' ', text).strip() if text else ''
+
+
+def _text_content(element) -> str:
+    return ''.join(element.itertext())
+
+
+def _render(element, out: List[str]):
+    """Append the element's text to `out`, one line per block-level element"""
+    tag = element.tag if isinstance(element.tag, str) else ''
+
+    if tag in ('tr',):
+        cells = [_collapse(_text_content(c)) for c in element if isinstance(c.tag, str) and c.tag in ('th', 'td')]
+        cells = [c for c in cells if c]
+        if cells:
+            out.append('\n' + (': '.join(cells) if len(cells) == 2 else ' | '.join(cells)) + '\n')
+        return
+    if tag == 'dt':
+        out.append('\n' + _collapse(_text_content(element)) + ': ')
+        return
+    if tag == 'dd':
+        out.append(_collapse(_text_content(element)) + '\n')
+        return
+
+    block = tag in BLOCK_TAGS
+    if block:
+        out.append('\n')
+    if element.text:
+        out.append(element.text)
+    for child in element:
+        if isinstance(child.tag, str):
+            _render(child, out)
+        if child.tail:
+            out.append(child.tail)
+    if block:
+        out.append('\n')
+
+
+def _section_text(element) -> str:
+    parts: List[str] = []
+    _render(element, parts)
+    lines = []
+    for line in ''.join(parts).split('\n'):
+        line = _collapse(line)
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def _structured_lines(tree) -> List[str]:
+    lines = []
+    title = _collapse(tree.findtext('.//title'))
+    if title:
+        lines.append(f'TITLE: {title}')
+    for h1 in tree.iter('h1'):
+        text = _collapse(_text_content(h1))
+        if text:
+            lines.append(f'H1: {text}')
+            break
+
+    for node in tree.iter('meta'):
+        key = (node.get('property') or node.get('name') or '').lower()
+        value = _collapse(node.get('content'))
+        if key in META_KEYS and value:
+            lines.append(f'{key}: {value[:300]}')
+
+    for raw in tree.xpath('//script[@type="application/ld+json"]/text()'):
+        try:
+            data = json.loads(raw.strip(), strict=False)
+        except ValueError:
+            continue
+        blob = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        if '"Product"' in blob or '"Offer"' in blob:
+            lines.append(f'JSON-LD: {blob[:3000]}')
+    return lines
+
+
+def _product_images(tree) -> List[str]:
+    images = []
+    for img in tree.iter('img'):
+        src = img.get('src') or img.get('data-src') or img.get('data-old-hires') or ''
+        if not src.startswith('http') or src in images:
+            continue
+        hints = ' '.join(filter(None, (img.get('id'), img.get('class'), img.get('alt'))))
+        if IMAGE_HINT_RE.search(hints) or img.get('alt'):
+            images.append(src)
+        if len(images) >= MAX_IMAGES:
+            break
+    return images
+
+
+def _score(attrs: str, text: str) -> float:
+    signal = len(TEXT_SIGNAL_RE.findall(text)) + 2 * len(CLASS_SIGNAL_RE.findall(attrs))
+    # Prefer dense sections: signal per ~500 chars, so a whole-page wrapper doesn't win
+    return signal / (1 + len(text) / 500)
+
+
+def _ranked_sections(tree) -> List[Tuple[float, object, str]]:
+    """Product-looking containers (by class/id) plus tables and definition lists, best first"""
+    candidates = []
+    scores = {}
+    for element in tree.iter(*SECTION_TAGS):
+        attrs = f"{element.get('class', '')} {element.get('id', '')}"
+        if element.tag not in ('table', 'dl') and not CLASS_SIGNAL_RE.search(attrs):
+            continue
+        text = _collapse(_text_content(element))
+        if len(text) < 20:
+            continue
+        # Repeated widgets (carousels, recommendations) share text - score them once
+        key = (attrs, text)
+        if key not in scores:
+            scores[key] = _score(attrs, text)
+        if scores[key] > 0:
+            candidates.append((scores[key], element, text))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return candidates
+
+
+def reduce_html(html: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+    """Reduce a product page to compact, ranked text within `max_tokens`"""
+    try:
+        tree = etree.fromstring(html, _parser())
+    except (ValueError, etree.LxmlError):
+        return ''
+    if tree is None:
+        return ''
+
+    budget = max_tokens * CHARS_PER_TOKEN
+    lines = _structured_lines(tree)
+    lines.extend(f'IMG: {src}' for src in _product_images(tree))
+    header = '\n'.join(lines)[:budget // 3]
+
+    etree.strip_elements(tree, *DROP_TAGS, with_tail=False)
+
+    chosen = set()
+    chosen_ancestors = set()
+    seen_texts = set()
+    sections: List[str] = []
+    used = len(header)
+    for score, element, flat_text in _ranked_sections(tree):
+        # Repeated widgets only count once
+        if flat_text in seen_texts:
+            continue
+        # Skip sections nested in / containing one already taken
+        ancestors = list(element.iterancestors())
+        if element in chosen_ancestors or any(a in chosen for a in ancestors):
+            continue
+        text = _section_text(element)
+        if used + len(text) > budget:
+            remaining = budget - used
+            if remaining > 200:
+                sections.append(text[:remaining])
+            break
+        chosen.add(element)
+        chosen_ancestors.update(ancestors)
+        seen_texts.add(flat_text)
+        sections.append(text)
+        used += len(text) + 2
+
+    if not sections:
+        body = tree.find('.//body')
+        sections.append(_section_text(body if body is not None else tree)[:budget - used])
+
+    return '\n\n'.join([header] + sections if header else sections)
@@ -0,0 +1,153 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+
+# ============================================================================
+# RAW HTML MEMORY BUDGET
+# ============================================================================
+# Raw rendered pages are 1-3 MB each and are only needed until they are
+# reduced. Fetches reserve their expected size up front, so the HTML held
+# between "fetched" and "reduced" stays under a fixed byte budget no matter
+# how many pages a request asks for (pages larger than the running size
+# estimate can overshoot it by that difference).
+
+HTML_MEMORY_BUDGET = int(os.getenv('SCRAPER_HTML_MEMORY_MB', '256')) * 1024 * 1024
+HTML_SIZE_ESTIMATE = 3 * 1024 * 1024  # upper end of real pages until sizes are seen
+
+# Raw pages are dropped once reduced. SCRAPER_SPILL_HTML=1 keeps a gzipped copy
+# for debugging an extraction (html_spill_store.get(url) returns the page the
+# reducer saw); nothing in the pipeline reads it back. Replay uses page_archive.
+SPILL_HTML = os.getenv('SCRAPER_SPILL_HTML', '0') == '1'
+HTML_SPOOL_DIR = os.getenv(
+    'SCRAPER_HTML_SPOOL',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'html')
+)
+HTML_SPOOL_MAX_BYTES = int(os.getenv('SCRAPER_HTML_SPOOL_MAX_MB', '1024')) * 1024 * 1024
+
+
+class MemoryBudget:
+    """Byte budget for raw HTML in flight on one event loop"""
+
+    def __init__(self, max_bytes: int = HTML_MEMORY_BUDGET, estimate: int = HTML_SIZE_ESTIMATE):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self._estimate = float(estimate)
+        self._cond: Optional[asyncio.Condition] = None
+
+    @property
+    def estimate(self) -> int:
+        """Running average page size, used to reserve before a fetch"""
+        return int(self._estimate)
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def reserve(self, nbytes: int) -> int:
+        """Wait until `nbytes` fit (a single page always fits an empty budget)"""
+        cond = self._condition()
+        async with cond:
+            if self.used and self.used + nbytes > self.max_bytes:
+                self.waits += 1
+                await cond.wait_for(lambda: not self.used or self.used + nbytes <= self.max_bytes)
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+        return nbytes
+
+    def resize(self, reserved: int, actual: int) -> int:
+        """Swap a reservation for the real page size once it is known"""
+        self.used += actual - reserved
+        self.peak = max(self.peak, self.used)
+        self._estimate = 0.8 * self._estimate + 0.2 * actual
+        return actual
+
+    async def release(self, nbytes: int):
+        cond = self._condition()
+        async with cond:
+            self.used -= nbytes
+            cond.notify_all()
+
+    def stats(self) -> Dict:
+        return {
+            'budget_mb': round(self.max_bytes / 2**20, 1),
+            'peak_mb': round(self.peak / 2**20, 1),
+            'waits': self.waits,
+        }
+
+
+# ============================================================================
+# COMPRESSED SPILL STORE
+# ============================================================================
+
+class HtmlSpillStore:
+    """Gzip-compressed raw pages on disk, keyed by URL, pruned oldest-first past `max_bytes`"""
+
+    def __init__(self, root: str = HTML_SPOOL_DIR, max_bytes: int = HTML_SPOOL_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, url: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(url.encode('utf-8', 'replace')).hexdigest() + '.html.gz')
+
+    def put(self, url: str, html: str) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        raw = html.encode('utf-8', 'replace')
+        data = gzip.compress(raw, compresslevel=3)
+        path = self.path_for(url)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.bytes_in += len(raw)
+            self.bytes_out += len(data)
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            self.prune()
+        return path
+
+    def get(self, url: str) -> Optional[str]:
+        try:
+            with open(self.path_for(url), 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8', 'replace')
+        except (OSError, EOFError):
+            return None
+
+    def prune(self):
+        try:
+            entries = [e for e in os.scandir(self.root) if e.name.endswith('.html.gz')]
+        except OSError:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                total -= entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'pages': self._writes,
+                'ratio': round(self.bytes_in / self.bytes_out, 1) if self.bytes_out else 0.0,
+            }
+
+
+html_budget = MemoryBudget()
+html_spill_store = HtmlSpillStore()
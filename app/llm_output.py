@@ -0,0 +1,257 @@
+import json
+import re
+import threading
+from typing import Dict, List, Optional
+
+from app.extractors import REQUIRED_FIELDS, _number
+
+
+# ============================================================================
+# EXTRACTION OUTPUT SCHEMA
+# ============================================================================
+# The fields the LLM fills in, with JSON types matching the Product model.
+# id, savings, product_classification, scraped_at, currency and source_website
+# are computed server-side in enhance_and_sort and never asked for.
+
+PRODUCT_SCHEMA_FIELDS = {
+    'name': 'string',
+    'brand': 'string',
+    'price': 'number',
+    'original_price': 'number',
+    'discount': 'integer',
+    'image_url': 'string',
+    'product_url': 'string',
+    'rating': 'number',
+    'reviews': 'integer',
+    'gender': 'string',
+    'size': 'string',
+    'colour': 'string',
+    'category': 'string',
+    'in_stock': 'boolean',
+    'availability_status': 'string',
+    'is_trending': 'boolean',
+}
+AVAILABILITY_STATUSES = ('in_stock', 'out_of_stock', 'limited_stock')
+
+
+def product_schema(fields: Optional[List[str]] = None) -> Dict:
+    """Strict JSON schema of a product object (every field present, null when unknown)"""
+    fields = list(fields or PRODUCT_SCHEMA_FIELDS)
+    properties = {}
+    for field in fields:
+        prop = {'type': [PRODUCT_SCHEMA_FIELDS[field], 'null']}
+        if field == 'availability_status':
+            prop['enum'] = list(AVAILABILITY_STATUSES) + [None]
+        properties[field] = prop
+    return {'type': 'object', 'properties': properties, 'required': fields, 'additionalProperties': False}
+
+
+def _response_format(name: str, schema: Dict) -> Dict:
+    return {'type': 'json_schema', 'json_schema': {'name': name, 'strict': True, 'schema': schema}}
+
+
+def single_product_format() -> Dict:
+    """response_format for one page: {"product": {...} | null}"""
+    return _response_format('product_extraction', {
+        'type': 'object',
+        'properties': {'product': {'anyOf': [product_schema(), {'type': 'null'}]}},
+        'required': ['product'],
+        'additionalProperties': False,
+    })
+
+
+def batch_products_format() -> Dict:
+    """response_format for a multi-page batch: {"products": [{"page", "url", "product"}]}"""
+    entry = {
+        'type': 'object',
+        'properties': {
+            'page': {'type': 'integer'},
+            'url': {'type': 'string'},
+            'product': {'anyOf': [product_schema(), {'type': 'null'}]},
+        },
+        'required': ['page', 'url', 'product'],
+        'additionalProperties': False,
+    }
+    return _response_format('batch_product_extraction', {
+        'type': 'object',
+        'properties': {'products': {'type': 'array', 'items': entry}},
+        'required': ['products'],
+        'additionalProperties': False,
+    })
+
+
+def fields_format(fields: List[str]) -> Dict:
+    """response_format for a targeted re-ask of a few fields"""
+    return _response_format('missing_fields', product_schema(fields))
+
+
+# ============================================================================
+# LOCAL REPAIR
+# ============================================================================
+
+FENCE_RE = re.compile(r'```(?:json)?', re.I)
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+PY_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+PY_LITERAL_RE = re.compile(r'\b(True|False|None)\b')
+
+
+def _balance(text: str) -> str:
+    """Close any brackets left open at the end of `text` (which must not end inside a string)"""
+    stack = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]' and stack:
+            stack.pop()
+    return text + ''.join(reversed(stack))
+
+
+def _element_cuts(text: str) -> List[int]:
+    """
+    Prefix lengths of `text` that end on an element boundary, last first
+
+    A boundary is just before a `,` or just after a `{`, `[`, `}` or `]` outside a
+    string, so the element being written when the output was cut off is always
+    dropped - a value such as "price": 12 may be the front of 1299.
+    """
+    cuts = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ',':
+            cuts.append(i)
+        elif ch in '{[}]':
+            cuts.append(i + 1)
+    return cuts[::-1]
+
+
+def _parse_truncated(text: str, max_cuts: int = 20):
+    """Parse a response cut off mid-object by dropping the partial tail element"""
+    for cut in _element_cuts(text)[:max_cuts]:
+        try:
+            return json.loads(_balance(text[:cut]), strict=False)
+        except ValueError:
+            continue
+    raise ValueError('truncated JSON could not be closed')
+
+
+def parse_llm_json(text: Optional[str]):
+    """json.loads with a cheap repair pass; raises ValueError when nothing usable is left"""
+    if text is None:
+        raise ValueError('empty response')
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    repaired = FENCE_RE.sub('', text).strip()
+    if repaired.lower() == 'null':
+        return None
+    starts = [i for i in (repaired.find('{'), repaired.find('[')) if i >= 0]
+    if not starts:
+        raise ValueError('no JSON object in response')
+    repaired = repaired[min(starts):]
+    repaired = PY_LITERAL_RE.sub(lambda m: PY_LITERALS[m.group(1)], repaired)
+    repaired = TRAILING_COMMA_RE.sub(r'\1', repaired)
+
+    try:
+        # Also tolerates extra text after the object ("... } Hope this helps")
+        return json.JSONDecoder(strict=False).raw_decode(repaired)[0]
+    except ValueError:
+        pass
+    return _parse_truncated(repaired)
+
+
+def coerce_product(raw) -> Optional[Dict]:
+    """Bring a model answer in line with the Product field types; None when it isn't a product"""
+    if not isinstance(raw, dict):
+        return None
+    product = {}
+    for key, value in raw.items():
+        kind = PRODUCT_SCHEMA_FIELDS.get(key)
+        if value is None or value == '':
+            # Strict schemas return every field; unknowns stay absent so defaults apply
+            continue
+        if kind is None:
+            product[key] = value
+            continue
+        if kind in ('number', 'integer'):
+            number = _number(value)
+            if number is None:
+                continue
+            if key == 'rating':
+                number = min(max(number, 0.0), 5.0)
+            elif key == 'discount':
+                number = min(max(number, 0.0), 100.0)
+            product[key] = int(number) if kind == 'integer' else number
+        elif kind == 'boolean':
+            product[key] = value if isinstance(value, bool) else str(value).strip().lower() in ('true', 'yes', '1')
+        else:
+            product[key] = str(value).strip()
+    if 'availability_status' in product and product['availability_status'] not in AVAILABILITY_STATUSES:
+        del product['availability_status']
+    return product
+
+
+def missing_answer_fields(product: Dict, known: Optional[Dict] = None, required=REQUIRED_FIELDS) -> List[str]:
+    """Required fields that neither the model nor the structured extractors supplied"""
+    known = known or {}
+    return [f for f in required if product.get(f) in (None, '', 0) and known.get(f) in (None, '', 0)]
+
+
+# ============================================================================
+# FAILURE COUNTERS
+# ============================================================================
+
+class ExtractionFailures:
+    """Per-stage counts of LLM extraction problems and how they were recovered"""
+
+    STAGES = (
+        'api_error',       # call failed after limiter retries
+        'truncated',       # finish_reason == length
+        'invalid_json',    # json.loads failed on the raw answer
+        'repaired',        # ...and the local repair fixed it
+        'unrepairable',    # ...and it didn't
+        'missing_entry',   # batch answer skipped a page (retried alone)
+        'missing_fields',  # product without name/brand/price
+        'reask_ok',        # targeted re-ask filled the gap
+        'reask_failed',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {stage: 0 for stage in self.STAGES}
+
+    def record(self, stage: str, n: int = 1):
+        with self._lock:
+            self.counts[stage] += n
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return dict(self.counts)
+
+    def report(self):
+        counts = {k: v for k, v in self.summary().items() if v}
+        print(f"   🩹 Extraction failures: {counts or 'none'}")
+
+
+EXTRACTION_FAILURES = ExtractionFailures()
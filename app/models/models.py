@@ -136,6 +136,82 @@ class Product(BaseModel):
         use_enum_values = True
 
 
+class ProductRecord:
+    """
+    Compact product used inside the scraper (extraction → dedupe → ranking)
+
+    One slot per Product field and no per-instance dict; unset fields simply
+    stay empty. Supports the dict-style get/[]/in/setdefault the pipeline
+    uses. Validation into a Product happens once, at the API boundary
+    (to_product).
+    """
+
+    __slots__ = (
+        'id', 'name', 'brand', 'price', 'original_price', 'discount', 'savings', 'image_url',
+        'product_url', 'rating', 'reviews', 'gender', 'size', 'colour', 'category', 'in_stock',
+        'availability_status', 'is_trending', 'product_classification', 'scraped_at', 'currency',
+        'source_website',
+    )
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ProductRecord':
+        """Build from an extraction dict, dropping keys that aren't Product fields"""
+        record = cls()
+        for key in cls.__slots__:
+            if key in data:
+                setattr(record, key, data[key])
+        return record
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    def setdefault(self, key: str, default=None):
+        if not hasattr(self, key):
+            setattr(self, key, default)
+        return getattr(self, key)
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__ if hasattr(self, key)}
+
+    def to_product(self) -> 'Product':
+        return Product(**self.to_dict())
+
+    def __repr__(self):
+        return f"ProductRecord({self.to_dict()!r})"
+
+
+class ProductList(list):
+    """Products from one scrape, plus why the pipeline stopped early (if it did)"""
+
+    def __init__(self, products=(), stop_reason: Optional[str] = None):
+        super().__init__(products)
+        self.stop_reason = stop_reason  # None (ran to completion), 'target' or 'deadline'
+
+    @property
+    def partial(self) -> bool:
+        """True when the deadline cut the run short - more matches may exist"""
+        return self.stop_reason == 'deadline'
+
+
 class ScrapeResponse(BaseModel):
     """API response model"""
     success: bool = Field(..., description="Whether the scraping was successful")
@@ -145,6 +221,7 @@ class ScrapeResponse(BaseModel):
     products: List[Product] = Field(default=[], description="List of products")
     timestamp: str = Field(..., description="Timestamp of the response")
     error: Optional[str] = Field(default=None, description="Error message if any")
+    partial: bool = Field(default=False, description="Whether the deadline stopped the scrape before it finished")
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import zstandard
+
+from app.canonical import product_key
+
+
+# ============================================================================
+# COMPRESSED PAGE ARCHIVE
+# ============================================================================
+# Every fetched page can be kept as a zstd blob named by the SHA-256 of its
+# HTML (identical refetches are stored once), with a SQLite index of
+# url / product key / site / fetch time → blob. Replay mode feeds archived
+# pages back through parsing, extraction, dedupe and ranking without any
+# network access.
+
+ARCHIVE_PAGES = os.getenv('SCRAPER_ARCHIVE_PAGES', '0') == '1'
+REPLAY_MODE = os.getenv('SCRAPER_REPLAY', '0') == '1'
+ARCHIVE_DIR = os.getenv(
+    'SCRAPER_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'archive')
+)
+ARCHIVE_ZSTD_LEVEL = int(os.getenv('SCRAPER_ARCHIVE_ZSTD_LEVEL', '6'))
+
+
+class PageArchive:
+    """Content-addressed zstd page store with a URL / fetch-time index"""
+
+    def __init__(self, root: str = ARCHIVE_DIR, level: int = ARCHIVE_ZSTD_LEVEL):
+        self.root = root
+        self.level = level
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite3'), check_same_thread=False, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                ' url TEXT NOT NULL, product_key TEXT NOT NULL, site TEXT, fetched_at REAL NOT NULL,'
+                ' sha256 TEXT NOT NULL, size INTEGER NOT NULL, stored_size INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_url ON pages(url, fetched_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_site ON pages(site, fetched_at)')
+            self._conn = conn
+        return self._conn
+
+    # zstd (de)compressor objects are not thread-safe - one per thread
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        if not hasattr(self._local, 'compressor'):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return self._local.compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        if not hasattr(self._local, 'decompressor'):
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.decompressor
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'blobs', digest[:2], f'{digest}.zst')
+
+    def put(self, url: str, html: str, site: Optional[str] = None, fetched_at: Optional[float] = None) -> str:
+        """Archive one fetch; returns the content hash"""
+        raw = html.encode('utf-8', 'replace')
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            stored_size = os.path.getsize(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = self._compressor().compress(raw)
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            stored_size = len(data)
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT INTO pages (url, product_key, site, fetched_at, sha256, size, stored_size)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, product_key(url), site, fetched_at or time.time(), digest, len(raw), stored_size)
+            )
+            conn.commit()
+        return digest
+
+    def load(self, digest: str) -> Optional[str]:
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return self._decompressor().decompress(f.read()).decode('utf-8', 'replace')
+        except (OSError, zstandard.ZstdError):
+            return None
+
+    def latest(self, url: str, before: Optional[float] = None) -> Optional[str]:
+        """HTML of the most recent fetch of `url` (at or before `before`)"""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT sha256 FROM pages WHERE url = ? AND fetched_at <= ? ORDER BY fetched_at DESC LIMIT 1',
+                (url, before if before is not None else float('inf'))
+            ).fetchone()
+        return self.load(row[0]) if row else None
+
+    def replay_items(self, site: Optional[str], limit: Optional[int] = None) -> List[Dict]:
+        """Newest archived fetch per product for a site, as search-result items"""
+        site = site.lower() if site else site  # sites are archived under their lowercase WEBSITES key
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT url, product_key, MAX(fetched_at) AS fetched FROM pages'
+                ' WHERE site IS ? OR ? IS NULL GROUP BY product_key ORDER BY fetched DESC LIMIT ?',
+                (site, site, limit if limit is not None else -1)
+            ).fetchall()
+        return [{'url': url, 'title': '', 'key': key, 'fetched_at': fetched} for url, key, fetched in rows]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            fetches, pages, size = self._connect().execute(
+                'SELECT COUNT(*), COUNT(DISTINCT url), COALESCE(SUM(size), 0) FROM pages'
+            ).fetchone()
+            blobs, stored = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(stored_size), 0)'
+                ' FROM (SELECT sha256, MAX(stored_size) AS stored_size FROM pages GROUP BY sha256)'
+            ).fetchone()
+        return {
+            'fetches': fetches,
+            'urls': pages,
+            'blobs': blobs,
+            'stored_mb': round(stored / 2**20, 1),
+            'ratio': round(size / stored, 1) if stored else 0.0,
+        }
+
+
+page_archive = PageArchive()
@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from app.extractors import extract_structured_product
+from app.html_reducer import DEFAULT_MAX_TOKENS, reduce_html
+
+
+# ============================================================================
+# PROCESS POOL FOR HTML PARSING
+# ============================================================================
+# lxml parsing, structured extraction and reduction are CPU-bound and hold the
+# GIL, so they run in worker processes. Pages are handed over as files in a
+# spool directory (tmpfs /dev/shm when available, i.e. shared memory) so only
+# a short path is pickled to the worker and only the small parsed result is
+# pickled back.
+
+PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', str(os.cpu_count() or 2)))
+SPOOL_DIR = os.getenv(
+    'SCRAPER_PARSE_SPOOL',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'scraper-spool')
+)
+
+
+def parse_page(html: str, site: Optional[str], max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+    """Structured fields + reduced LLM text for one page"""
+    return {
+        'structured': extract_structured_product(html, site),
+        'reduced': reduce_html(html, max_tokens=max_tokens),
+    }
+
+
+def parse_page_file(path: str, site: Optional[str], max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+    """Worker entry point: read the spooled page, parse it, delete the file"""
+    try:
+        with open(path, 'rb') as f:
+            html = f.read().decode('utf-8', 'replace')
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return parse_page(html, site, max_tokens)
+
+
+class ParsePool:
+    """Lazily started process pool fed with spooled HTML files"""
+
+    def __init__(self, workers: int = PARSE_WORKERS, spool_dir: str = SPOOL_DIR):
+        self.workers = workers
+        self.spool_dir = spool_dir
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    os.makedirs(self.spool_dir, exist_ok=True)
+                    # spawn: the parent runs Playwright/event-loop threads, forking those is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def _spool(self, html: str) -> str:
+        path = os.path.join(self.spool_dir, f'{uuid.uuid4().hex}.html')
+        with open(path, 'wb') as f:
+            f.write(html.encode('utf-8', 'replace'))
+        return path
+
+    def submit(self, html: str, site: Optional[str], max_tokens: int = DEFAULT_MAX_TOKENS) -> Future:
+        """Spool a page and queue it for parsing (runs inline when the pool is disabled)"""
+        if self.workers <= 0:
+            future: Future = Future()
+            try:
+                future.set_result(parse_page(html, site, max_tokens))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        executor = self._get_executor()
+        path = self._spool(html)
+        try:
+            return executor.submit(parse_page_file, path, site, max_tokens)
+        except BaseException:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+
+    def parse_sync(self, html: str, site: Optional[str], max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+        return self.submit(html, site, max_tokens).result()
+
+    async def parse(self, html: str, site: Optional[str], max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+        """Parse a page without blocking the event loop"""
+        if self.workers <= 0:
+            return await asyncio.to_thread(parse_page, html, site, max_tokens)
+        future = await asyncio.to_thread(self.submit, html, site, max_tokens)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+parse_pool = ParsePool()
@@ -0,0 +1,68 @@
+import os
+from typing import List, Optional
+
+from app.models.models import ProductFilters
+
+
+# ============================================================================
+# SEARCH QUERY PLANNER
+# ============================================================================
+# One query listing every brand, gender and colour ("Nike Adidas Puma sports
+# shoes men black") matches few pages well, so search pages deep for enough
+# URLs. Multi-valued filters are split into targeted sub-queries (one per
+# brand, per gender when that stays within the plan limit) that are searched
+# side by side; the URL budget then follows each sub-query's observed yield.
+
+QUERY_PLAN_MAX = int(os.getenv('SCRAPER_QUERY_PLAN_MAX', '8'))
+
+
+def plan_queries(filters: ProductFilters, max_queries: int = QUERY_PLAN_MAX) -> List[ProductFilters]:
+    """Narrowed copies of `filters`, one per sub-query (just `filters` when nothing splits)"""
+    brands = filters.brand or []
+    genders = filters.gender or []
+    split_gender = len(genders) > 1 and len(brands) * len(genders) <= max_queries
+    if len(brands) <= 1 and not split_gender:
+        return [filters]
+
+    # A query naming several colours matches none of them well; one colour stays in
+    colors = filters.color if filters.color and len(filters.color) == 1 else None
+    gender_groups = [[g] for g in genders] if split_gender else [filters.gender]
+    # More brands than the plan allows share sub-queries rather than being dropped
+    groups = max(1, min(len(brands), max_queries // len(gender_groups)))
+    brand_groups = [brands[i::groups] for i in range(groups)]
+    return [
+        filters.copy(update={'brand': group, 'gender': gender, 'color': colors})
+        for group in brand_groups
+        for gender in gender_groups
+    ]
+
+
+def share_budget(total: int, weights: List[float], caps: Optional[List[float]] = None) -> List[int]:
+    """
+    Split `total` in proportion to `weights`, never giving a share more than its cap
+
+    What a capped share can't take is spread over the others (water-filling);
+    rounding uses largest remainders so the shares add up to min(total, sum(caps)).
+    """
+    caps = caps or [float('inf')] * len(weights)
+    shares = [0.0] * len(weights)
+    open_ = [i for i, w in enumerate(weights) if w > 0 and caps[i] > 0]
+    left = float(total)
+    while open_ and left > 1e-9:
+        weight = sum(weights[i] for i in open_)
+        capped = [i for i in open_ if left * weights[i] / weight >= caps[i] - shares[i]]
+        if not capped:
+            for i in open_:
+                shares[i] += left * weights[i] / weight
+            break
+        for i in capped:
+            left -= caps[i] - shares[i]
+            shares[i] = caps[i]
+        open_ = [i for i in open_ if i not in capped]
+
+    whole = [int(s) for s in shares]
+    extra = int(round(sum(shares))) - sum(whole)
+    by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - whole[i], reverse=True)
+    for i in by_remainder[:max(extra, 0)]:
+        whole[i] += 1
+    return whole
@@ -0,0 +1,89 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.models.models import ProductCategory
+
+
+# ============================================================================
+# COLUMNAR ENHANCEMENT & RANKING
+# ============================================================================
+# Numeric product fields are pulled into NumPy arrays once, so savings,
+# classification and the ranking order are computed in bulk instead of per
+# dict. Only the rows that are actually returned are turned into Product
+# models by the caller.
+
+CLASS_TRENDING, CLASS_TOP_SELLING, CLASS_NORMAL = 0, 1, 2
+CLASS_VALUES = (ProductCategory.TRENDING.value, ProductCategory.TOP_SELLING.value, ProductCategory.NORMAL.value)
+
+
+def _to_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _column(products: List[Dict], key: str) -> np.ndarray:
+    return np.fromiter((_to_float(p.get(key)) for p in products), dtype=np.float64, count=len(products))
+
+
+def product_columns(products: List[Dict]) -> Dict[str, np.ndarray]:
+    """Numeric fields as arrays, with the same defaults enhance_and_sort applies per row"""
+    price = np.maximum(_column(products, 'price'), 0.0)
+    original_price = _column(products, 'original_price')
+    original_price = np.where(original_price > 0, original_price, price)
+    return {
+        'price': price,
+        'original_price': original_price,
+        'discount': np.clip(_column(products, 'discount'), 0, 100).astype(np.int64),
+        'rating': np.clip(_column(products, 'rating'), 0.0, 5.0),
+        'reviews': np.maximum(_column(products, 'reviews'), 0).astype(np.int64),
+        'in_stock': np.fromiter((bool(p.get('in_stock', True)) for p in products), dtype=bool, count=len(products)),
+    }
+
+
+def savings(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    price, original = columns['price'], columns['original_price']
+    return np.where((original > price) & (price > 0), np.round(original - price, 2), 0.0)
+
+
+def classify(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """CLASS_* code per row: trending (discount >= 30, rating >= 4.0), top selling (500+ reviews, rating >= 4.2), else normal"""
+    rating = columns['rating']
+    trending = (columns['discount'] >= 30) & (rating >= 4.0)
+    top_selling = (columns['reviews'] >= 500) & (rating >= 4.2)
+    return np.where(trending, CLASS_TRENDING, np.where(top_selling, CLASS_TOP_SELLING, CLASS_NORMAL))
+
+
+def rank(columns: Dict[str, np.ndarray], classes: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Row indices in display order: in-stock → trending → top selling → rating → reviews → discount
+
+    With `limit`, rows are first narrowed with a partial selection on the
+    leading keys; only that shortlist is fully sorted. Ties keep input order.
+    """
+    n = len(classes)
+    # Stock + class tier (0..5) and rating folded into one key: lower is better
+    primary = ((~columns['in_stock']) * 3 + classes) * 10.0 - columns['rating']
+    candidates = np.arange(n)
+    if limit is not None and limit < n:
+        if limit <= 0:
+            return candidates[:0]
+        cutoff = np.partition(primary, limit - 1)[limit - 1]
+        # Everything tied with the k-th row stays in, so the exact order decides
+        candidates = np.flatnonzero(primary <= cutoff)
+
+    keys = (
+        -columns['discount'][candidates],
+        -columns['reviews'][candidates],
+        primary[candidates],
+    )
+    order = candidates[np.lexsort(keys)]
+    return order[:limit] if limit is not None else order
+
+
+def offer_order(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Row order best offer first: in stock, then cheapest (unknown prices last)"""
+    price = np.where(columns['price'] > 0, columns['price'], np.inf)
+    return np.lexsort((price, ~columns['in_stock']))
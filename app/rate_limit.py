@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+# ============================================================================
+# TOKEN BUCKET
+# ============================================================================
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available; otherwise return the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until tokens are available"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        """Wait for tokens without blocking the event loop"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+# ============================================================================
+# ADAPTIVE (AIMD) LIMITER FOR RATE-LIMITED APIS
+# ============================================================================
+
+class AdaptiveLimiter:
+    """
+    Thread-safe concurrency limit + requests/tokens-per-minute budget
+
+    The concurrency limit grows additively (about +1 per `limit` successful
+    calls) and is cut multiplicatively on throttling or timeouts - once per
+    overload: calls that started before the last cut were sent at the old
+    limit, so their 429s don't cut it again. A Retry-After from the server
+    pauses every caller until it has passed.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, rpm: int, tpm: int, initial: float = 4, minimum: float = 1,
+                 maximum: float = 16, backoff: float = 0.5):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._window: deque = deque()  # [started_at, tokens] per call in the last minute
+        self._blocked_until = 0.0
+        self._last_cut = float('-inf')
+        self._cond = threading.Condition()
+        self.stats = {'ok': 0, 'throttled': 0, 'timeout': 0, 'error': 0}
+
+    def _usage(self, now: float):
+        while self._window and self._window[0][0] <= now - self.WINDOW:
+            self._window.popleft()
+        return len(self._window), sum(entry[1] for entry in self._window)
+
+    def acquire(self, tokens: int = 0) -> list:
+        """Block until a call of ~`tokens` tokens may start; returns a handle for release()"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    requests, used = self._usage(now)
+                    # An empty window always admits one call, even one larger than the TPM budget
+                    budget_ok = requests < self.rpm and (used + tokens <= self.tpm or not self._window)
+                    if budget_ok and self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        entry = [now, tokens]
+                        self._window.append(entry)
+                        return entry
+                    wait = self._window[0][0] + self.WINDOW - now if not budget_ok else 1.0
+                self._cond.wait(timeout=min(max(wait, 0.01), 5.0))
+
+    def release(self, entry: list, outcome: str = 'ok', tokens: Optional[int] = None,
+                retry_after: Optional[float] = None):
+        """outcome: 'ok', 'throttled', 'timeout' or 'error'"""
+        with self._cond:
+            self.in_flight -= 1
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+            if tokens is not None:
+                entry[1] = tokens
+            if outcome == 'ok':
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif outcome in ('throttled', 'timeout'):
+                if entry[0] >= self._last_cut:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_cut = time.monotonic()
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            requests, used = self._usage(time.monotonic())
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'requests_last_minute': requests,
+                'tokens_last_minute': used,
+                **self.stats,
+            }
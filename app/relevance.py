@@ -0,0 +1,113 @@
+import re
+from typing import Dict, List, Optional
+
+from app.extractors import _number
+from app.models.models import ProductFilters
+
+
+# ============================================================================
+# PRE-SCRAPE RELEVANCE SCORING
+# ============================================================================
+# Scores a Custom Search result against the request filters from the title,
+# snippet and pagemap data the API already returned, so pages that are sure
+# to be rejected after extraction are never rendered. A result is only
+# dropped on explicit contradicting evidence (another brand in the pagemap,
+# a listed price outside the range, the other gender only); missing evidence
+# just lowers its score.
+
+# Slack on the listed price - search snippets lag behind live prices
+PRICE_TOLERANCE = 0.15
+
+PAGEMAP_BRAND_KEYS = ('product:brand', 'og:brand', 'brand')
+PAGEMAP_PRICE_KEYS = ('product:price:amount', 'og:price:amount', 'price')
+PRICE_RE = re.compile(r'(?:₹|rs\.?|inr)\s*([\d,]+(?:\.\d+)?)', re.I)
+
+GENDER_WORDS = {
+    'men': re.compile(r"\b(?:men|mens|men's|male|boys?)\b", re.I),
+    'women': re.compile(r"\b(?:women|womens|women's|female|ladies|girls?)\b", re.I),
+}
+UNISEX_RE = re.compile(r'\bunisex\b', re.I)
+
+
+def _pagemap_values(item: Dict, keys) -> List[str]:
+    """Values for `keys` from the pagemap's metatags and product/offer objects"""
+    pagemap = item.get('pagemap') or {}
+    values = []
+    for group in ('metatags', 'product', 'offer', 'aggregateoffer'):
+        for entry in pagemap.get(group) or []:
+            if not isinstance(entry, dict):
+                continue
+            for key in keys:
+                if entry.get(key):
+                    values.append(str(entry[key]))
+    return values
+
+
+def _keywords(text: str) -> List[str]:
+    return [w.rstrip('s') for w in re.findall(r'[a-z]+', text.lower()) if len(w) > 3]
+
+
+def _gender_key(value: str) -> Optional[str]:
+    value = value.lower()
+    if value.startswith(('women', 'female', 'ladies', 'girl')):
+        return 'women'
+    if value.startswith(('men', 'male', 'boy')):
+        return 'men'
+    return None
+
+
+def score_search_result(item: Dict, filters: ProductFilters) -> Optional[float]:
+    """Relevance of one CSE result to the filters (higher is better); None if clearly irrelevant"""
+    pagemap_text = ' '.join(_pagemap_values(item, ('og:title', 'og:description', 'name', 'description')))
+    text = f"{item.get('title', '')} {item.get('snippet', '')} {pagemap_text}"
+    text_lower = text.lower()
+    score = 0.0
+
+    brands = [b.lower() for b in filters.brand or []]
+    if brands:
+        listed_brands = [b.lower() for b in _pagemap_values(item, PAGEMAP_BRAND_KEYS)]
+        if listed_brands and not any(b in lb or lb in b for b in brands for lb in listed_brands):
+            return None
+        if listed_brands:
+            score += 4
+        elif any(b in text_lower for b in brands):
+            score += 3
+
+    keywords = _keywords(filters.category or '')
+    if keywords:
+        hits = sum(1 for k in keywords if k in text_lower)
+        score += 2 * hits / len(keywords)
+
+    wanted = {_gender_key(g) for g in filters.gender or []} - {None}
+    if wanted and not UNISEX_RE.search(text):
+        mentioned = {g for g, pattern in GENDER_WORDS.items() if pattern.search(text)}
+        if mentioned & wanted:
+            score += 1
+        elif mentioned:
+            return None
+
+    colors = [c.lower() for c in filters.color or []]
+    if colors and any(c in text_lower for c in colors):
+        score += 1
+
+    if filters.price_range:
+        min_price = filters.price_range.min or 0
+        max_price = filters.price_range.max
+        listed = [p for p in (_number(v) for v in _pagemap_values(item, PAGEMAP_PRICE_KEYS)) if p]
+        in_snippet = [_number(m) for m in PRICE_RE.findall(text)]
+
+        def in_range(price: float) -> bool:
+            return price >= min_price * (1 - PRICE_TOLERANCE) and (
+                not max_price or price <= max_price * (1 + PRICE_TOLERANCE)
+            )
+
+        if listed:
+            if not any(in_range(p) for p in listed):
+                return None
+            score += 2
+        elif in_snippet:
+            # Snippets mix in MRP, EMI and other variants - only a soft signal
+            score += 1 if any(in_range(p) for p in in_snippet if p) else -1
+
+    return score
+
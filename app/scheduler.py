@@ -0,0 +1,201 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.rate_limit import TokenBucket
+
+
+# ============================================================================
+# PER-DOMAIN POLITENESS SCHEDULER
+# ============================================================================
+# Every page fetch takes a slot for its domain: a token bucket spaces the
+# requests, a cap bounds how many are in flight, and block/captcha responses
+# put only that domain into exponential backoff while other domains carry
+# on. Queue depth and fetch latency are tracked per domain.
+
+DOMAIN_RATE = float(os.getenv('SCRAPER_DOMAIN_RATE', '2'))             # fetches per second
+DOMAIN_BURST = float(os.getenv('SCRAPER_DOMAIN_BURST', '4'))
+DOMAIN_MAX_IN_FLIGHT = int(os.getenv('SCRAPER_DOMAIN_MAX_IN_FLIGHT', '6'))
+BACKOFF_BASE = float(os.getenv('SCRAPER_DOMAIN_BACKOFF_BASE', '5'))
+BACKOFF_MAX = float(os.getenv('SCRAPER_DOMAIN_BACKOFF_MAX', '300'))
+# Timeouts/errors in a row that count as throttling
+FAILURES_BEFORE_BACKOFF = 3
+LATENCY_WINDOW = 200
+
+
+def _parse_domain_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """'amazon.in=1:4,flipkart.com=3:8' → {domain: (rate, max_in_flight)}"""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        try:
+            domain, value = part.split('=')
+            rate, in_flight = value.split(':')
+            limits[domain.strip().lower()] = (float(rate), int(in_flight))
+        except ValueError:
+            print(f"   ⚠️ Ignoring bad SCRAPER_DOMAIN_LIMITS entry: {part}")
+    return limits
+
+
+DOMAIN_LIMITS = _parse_domain_limits(os.getenv('SCRAPER_DOMAIN_LIMITS', ''))
+
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class _DomainState:
+    def __init__(self, rate: float, max_in_flight: int):
+        self.bucket = TokenBucket(rate=rate, capacity=max(DOMAIN_BURST, 1.0))
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.queued = 0
+        self.backoff_until = 0.0
+        self.consecutive_blocks = 0
+        self.consecutive_failures = 0
+        self.counts = {'ok': 0, 'blocked': 0, 'failed': 0, 'backoffs': 0}
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.slots = asyncio.Condition()
+
+
+class FetchSlot:
+    """Handle for one scheduled fetch; set `outcome` to 'blocked' or 'failed' before it closes
+
+    A cancelled fetch (a losing hedge, a stopped pipeline) only frees its slot.
+    """
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.outcome = 'ok'
+        self.waited = 0.0
+
+
+class DomainScheduler:
+    """Per-domain token buckets, in-flight caps and block-triggered backoff (one event loop)"""
+
+    def __init__(self, rate: float = DOMAIN_RATE, max_in_flight: int = DOMAIN_MAX_IN_FLIGHT,
+                 limits: Optional[Dict[str, Tuple[float, int]]] = None):
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self.limits = DOMAIN_LIMITS if limits is None else limits
+        self._domains: Dict[str, _DomainState] = {}
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            rate, max_in_flight = self.limits.get(domain, (self.rate, self.max_in_flight))
+            state = self._domains[domain] = _DomainState(rate, max_in_flight)
+        return state
+
+    async def _acquire(self, state: _DomainState):
+        while True:
+            now = time.monotonic()
+            if state.backoff_until > now:
+                await asyncio.sleep(state.backoff_until - now)
+                continue
+            async with state.slots:
+                await state.slots.wait_for(lambda: state.in_flight < state.max_in_flight)
+                # Backoff may have started while we waited for a slot
+                if state.backoff_until > time.monotonic():
+                    continue
+                wait = state.bucket.try_acquire()
+                if wait <= 0:
+                    state.in_flight += 1
+                    return
+            await asyncio.sleep(wait)
+
+    async def _release(self, state: _DomainState, domain: str, outcome: str, seconds: float):
+        async with state.slots:
+            state.in_flight -= 1
+            state.slots.notify_all()
+
+        if outcome == 'cancelled':
+            return
+        state.counts[outcome] += 1
+        if outcome == 'ok':
+            state.latencies.append(seconds)
+            state.consecutive_blocks = state.consecutive_failures = 0
+            return
+        if outcome == 'blocked':
+            state.consecutive_blocks += 1
+            level = state.consecutive_blocks
+        else:
+            state.consecutive_failures += 1
+            if state.consecutive_failures < FAILURES_BEFORE_BACKOFF:
+                return
+            level = state.consecutive_failures - FAILURES_BEFORE_BACKOFF + 1
+
+        delay = min(BACKOFF_BASE * 2 ** (level - 1), BACKOFF_MAX) * random.uniform(0.8, 1.2)
+        until = time.monotonic() + delay
+        if until > state.backoff_until:
+            state.backoff_until = until
+            state.counts['backoffs'] += 1
+            print(f"   🛑 {domain}: {outcome} x{level}, backing off {delay:.0f}s")
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Wait for this URL's domain to allow another fetch, and hold the slot while fetching"""
+        domain = domain_of(url)
+        state = self._state(domain)
+        fetch = FetchSlot(domain)
+        queued_at = time.monotonic()
+        state.queued += 1
+        try:
+            await self._acquire(state)
+        finally:
+            state.queued -= 1
+        fetch.waited = time.monotonic() - queued_at
+
+        start = time.monotonic()
+        try:
+            yield fetch
+        except asyncio.CancelledError:
+            fetch.outcome = 'cancelled'
+            raise
+        except BaseException:
+            fetch.outcome = 'failed'
+            raise
+        finally:
+            await self._release(state, domain, fetch.outcome, time.monotonic() - start)
+
+    def backing_off(self, url: str) -> bool:
+        state = self._domains.get(domain_of(url))
+        return state is not None and state.backoff_until > time.monotonic()
+
+    def latency_percentile(self, url_or_domain: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Seconds at percentile `pct` (0-100) of recent successful fetches, None with fewer than `min_samples`"""
+        domain = domain_of(url_or_domain) if '://' in url_or_domain else url_or_domain
+        state = self._domains.get(domain)
+        if state is None or len(state.latencies) < max(min_samples, 1):
+            return None
+        ordered = sorted(state.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        result = {}
+        for domain, state in self._domains.items():
+            p50 = self.latency_percentile(domain, 50)
+            p95 = self.latency_percentile(domain, 95)
+            result[domain] = {
+                'queued': state.queued,
+                'in_flight': state.in_flight,
+                **state.counts,
+                'p50_s': round(p50, 2) if p50 is not None else None,
+                'p95_s': round(p95, 2) if p95 is not None else None,
+                'backoff_s': round(max(state.backoff_until - now, 0.0), 1),
+            }
+        return result
+
+    def report(self):
+        for domain, s in self.stats().items():
+            print(f"   🌐 {domain}: ok {s['ok']}, blocked {s['blocked']}, failed {s['failed']}, "
+                  f"backoffs {s['backoffs']}, p50 {s['p50_s']}s, p95 {s['p95_s']}s, queued {s['queued']}")
+
+
+domain_scheduler = DomainScheduler()
@@ -1,35 +1,141 @@
 import asyncio
 import json
 import os
+import random
 import re
+import threading
 import time
-from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
 from urllib.parse import quote, unquote
 
 import requests
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
 import openai
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 from dotenv import load_dotenv
 
-from app.models.models import ProductFilters, Product, ProductCategory,PriceRange
+from app.models.models import ProductFilters, Product, ProductList, ProductRecord
+from app.browser_pool import BrowserPool, get_runtime
+from app.caching import ExtractionCache, TTLCache
+from app.rate_limit import AdaptiveLimiter, TokenBucket
+from app.html_reducer import estimate_tokens, reduce_html
+from app.extractors import EXTRACTOR_COVERAGE, missing_fields
+from app.llm_output import (
+    EXTRACTION_FAILURES, batch_products_format, coerce_product, fields_format,
+    missing_answer_fields, parse_llm_json, single_product_format
+)
+from app.parse_pool import parse_page, parse_pool
+from app.html_store import SPILL_HTML, MemoryBudget, html_budget, html_spill_store
+from app.page_archive import ARCHIVE_PAGES, REPLAY_MODE, page_archive
+from app.relevance import score_search_result
+from app.query_planner import plan_queries, share_budget
+from app.canonical import canonicalize_url, dedupe_urls, product_key
+from app.dedupe import NearDuplicateIndex
+from app.ranking import CLASS_VALUES, classify, offer_order, product_columns, rank, savings
+from app.fetcher import HTTP_FAST_PATH, FETCH_STATS, FetchStats, fetch_http_async, has_product_signal, is_blocked_page
+from app.scheduler import domain_scheduler
+from app.hedging import hedge_controller
 
 # Load environment variables
 load_dotenv()
 openai.api_key = os.getenv('OPENAI_API_KEY')
+openai.max_retries = 0  # retries go through llm_chat_completion so the limiter sees every 429
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 GOOGLE_CX = os.getenv('GOOGLE_CX')
 
+# Google CSE pagination: parallel page requests, requests/second, result cache lifetime
+CSE_CONCURRENCY = int(os.getenv('GOOGLE_CSE_CONCURRENCY', '4'))
+CSE_QPS = float(os.getenv('GOOGLE_CSE_QPS', '5'))
+CSE_CACHE_TTL = int(os.getenv('GOOGLE_CSE_CACHE_TTL', '21600'))
+CSE_MAX_PAGES = 10  # CSE never returns results past start=91
+# Collect this many times max_results relevant URLs so ranking has something to choose from
+CSE_OVERFETCH = float(os.getenv('GOOGLE_CSE_OVERFETCH', '1.5'))
+
+# Max pages in flight per scrape. Browser renders are bounded by the pool capacity
+# (sized from this, see browser_pool.CONTEXTS_PER_BROWSER); the rest of the workers
+# are HTTP fast-path fetches or wait for a browser context
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', '50'))
+
+# Streaming pipeline: max parallel LLM extractions and the size of each inter-stage queue
+EXTRACT_CONCURRENCY = int(os.getenv('SCRAPER_EXTRACT_CONCURRENCY', '16'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('SCRAPER_PIPELINE_QUEUE_SIZE', '10'))
+
+# Request deadline in seconds (0 = none, the default - callers opt in); the pipeline
+# stops DEADLINE_MARGIN early so dedupe, ranking and the response still fit inside it
+REQUEST_DEADLINE = float(os.getenv('SCRAPER_DEADLINE', '0'))
+DEADLINE_MARGIN = float(os.getenv('SCRAPER_DEADLINE_MARGIN', '3'))
+
+# Max wait for a page's readiness selectors before taking whatever has rendered
+READY_TIMEOUT = float(os.getenv('SCRAPER_READY_TIMEOUT', '6'))
+
+# LLM extraction: model, prompt revision (bump when the prompt changes) and result cache
+LLM_MODEL = os.getenv('SCRAPER_LLM_MODEL', 'gpt-4o-mini')
+PROMPT_VERSION = 'extract-v3'
+# Revision of html_reducer + extractors output (bump when either changes) for the parsed-page cache
+PARSE_VERSION = 'parse-v1'
+PAGE_TOKEN_BUDGET = int(os.getenv('SCRAPER_PAGE_TOKEN_BUDGET', '6000'))
+
+# OpenAI account limits and retry policy for extraction calls; actual concurrency
+# adapts between 1 and EXTRACT_CONCURRENCY starting from LLM_INITIAL_CONCURRENCY
+OPENAI_RPM_LIMIT = int(os.getenv('OPENAI_RPM_LIMIT', '500'))
+OPENAI_TPM_LIMIT = int(os.getenv('OPENAI_TPM_LIMIT', '200000'))
+LLM_INITIAL_CONCURRENCY = int(os.getenv('SCRAPER_LLM_INITIAL_CONCURRENCY', '4'))
+LLM_TIMEOUT = float(os.getenv('SCRAPER_LLM_TIMEOUT', '60'))
+LLM_MAX_RETRIES = int(os.getenv('SCRAPER_LLM_MAX_RETRIES', '6'))
+# Output budget of a single-page answer, and of the one re-ask when it was cut off
+LLM_MAX_TOKENS = int(os.getenv('SCRAPER_LLM_MAX_TOKENS', '1000'))
+LLM_RETRY_MAX_TOKENS = int(os.getenv('SCRAPER_LLM_RETRY_MAX_TOKENS', '2500'))
+
+# Multi-page LLM batches: prompt token budget, pages per call, and how long a
+# partial batch waits for more pages before it is sent anyway
+BATCH_TOKEN_BUDGET = int(os.getenv('SCRAPER_BATCH_TOKEN_BUDGET', '24000'))
+BATCH_MAX_PAGES = int(os.getenv('SCRAPER_BATCH_MAX_PAGES', '8'))
+BATCH_LINGER = float(os.getenv('SCRAPER_BATCH_LINGER', '0.5'))
+EXTRACTION_CACHE_PATH = os.getenv(
+    'SCRAPER_EXTRACTION_CACHE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'extraction_cache.sqlite3')
+)
+# Parsed pages by canonical product key, shared across requests (prices move, so keep it short)
+PAGE_CACHE_PATH = os.getenv(
+    'SCRAPER_PAGE_CACHE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'page_cache.sqlite3')
+)
+PAGE_CACHE_TTL = int(os.getenv('SCRAPER_PAGE_CACHE_TTL', '21600'))
+EXTRACTION_CACHE_TTL = int(os.getenv('SCRAPER_EXTRACTION_CACHE_TTL', str(7 * 24 * 3600)))
+EXTRACTION_CACHE_MAX_MB = int(os.getenv('SCRAPER_EXTRACTION_CACHE_MAX_MB', '256'))
+
 # Website configurations
+# ready_selectors: every group must match before the page counts as rendered
+# (each group is a CSS selector list - title alternatives, price alternatives)
 WEBSITES = {
-    'flipkart': {'base': 'https://www.flipkart.com/search?q=', 'domain': 'flipkart.com'},
-    'reliancedigital': {'base': 'https://www.reliancedigital.in/search?q=', 'domain': 'reliancedigital.in'},
-    'myntra': {'base': 'https://www.myntra.com/', 'domain': 'myntra.com'},
-    'amazon': {'base': 'https://www.amazon.in/s?k=', 'domain': 'amazon.in'}
+    'flipkart': {
+        'base': 'https://www.flipkart.com/search?q=', 'domain': 'flipkart.com',
+        'ready_selectors': ['span.VU-ZEz, span.B_NuCI, h1', 'div.Nx9bqj, div._30jeq3, div._16Jk6d']
+    },
+    'reliancedigital': {
+        'base': 'https://www.reliancedigital.in/search?q=', 'domain': 'reliancedigital.in',
+        'ready_selectors': ['h1.pdp__title, h1', '.pdp__offerPrice, .pdp__priceSection, [class*="price"]']
+    },
+    'myntra': {
+        'base': 'https://www.myntra.com/', 'domain': 'myntra.com',
+        'ready_selectors': ['h1.pdp-title, h1.pdp-name', 'span.pdp-price, .pdp-price']
+    },
+    'amazon': {
+        'base': 'https://www.amazon.in/s?k=', 'domain': 'amazon.in',
+        'ready_selectors': ['#productTitle', '.a-price .a-offscreen, #corePrice_feature_div, #priceblock_ourprice, #outOfStock, #availability']
+    }
 }
 
 
+def site_for_url(url: str) -> Optional[str]:
+    """Map a product URL to its WEBSITES key"""
+    url_lower = url.lower()
+    for site, config in WEBSITES.items():
+        if config['domain'] in url_lower:
+            return site
+    return None
+
+
 # ============================================================================
 # STEP 1: BUILD SEARCH QUERY & FIND PRODUCT URLS
 # ============================================================================
@@ -84,8 +190,89 @@ def is_product_page(url: str, domain: str) -> bool:
     return len(url) > 50
 
 
-def search_product_urls(query: str, website: str, max_results: int = 100) -> List[Dict[str, str]]:
-    """Search Google for PRODUCT pages only (skip category pages)"""
+_cse_limiter = TokenBucket(rate=CSE_QPS)
+_cse_cache = TTLCache(maxsize=5000, ttl=CSE_CACHE_TTL)
+
+
+def fetch_search_page(query: str, site_domain: str, start_index: int) -> Optional[List[Dict]]:
+    """Fetch one CSE result page (cached by query/site/start); None on API error"""
+    cache_key = (query, site_domain, start_index)
+    cached = _cse_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    params = {
+        'key': GOOGLE_API_KEY,
+        'cx': GOOGLE_CX,
+        'q': f'{query} site:{site_domain}',
+        'start': start_index,
+        'num': 10,
+        'gl': 'in',
+        'hl': 'en'
+    }
+    
+    try:
+        _cse_limiter.acquire()
+        response = requests.get(
+            'https://www.googleapis.com/customsearch/v1',
+            params=params,
+            timeout=10
+        )
+        
+        if response.status_code != 200:
+            print(f"   ⚠️ Status {response.status_code} at index {start_index}, stopping pagination")
+            return None
+        
+        items = response.json().get('items', [])
+        _cse_cache.set(cache_key, items)
+        return items
+        
+    except Exception as e:
+        print(f"❌ Search Error: {e}")
+        return None
+
+
+def accept_search_items(items: List[Dict], site_domain: str, filters: Optional[ProductFilters],
+                        seen_keys: set, counts: Dict[str, int]) -> List[Dict]:
+    """Product-page results from one CSE page not seen before, scored when filters are given"""
+    accepted = []
+    for item in items:
+        url = item.get('link', '')
+        title = item.get('title', '')
+        
+        # ONLY accept actual product pages
+        if not is_product_page(url, site_domain):
+            continue
+        # One entry per product, however many URL variants search returns
+        url, key = canonicalize_url(url)
+        key = key or f'url:{url}'
+        if key in seen_keys:
+            counts['duplicates'] += 1
+            continue
+        if filters is None:
+            seen_keys.add(key)
+            accepted.append({'url': url, 'title': title, 'key': key})
+            continue
+        relevance = score_search_result(item, filters)
+        if relevance is None:
+            counts['skipped'] += 1
+            continue
+        seen_keys.add(key)
+        accepted.append({'url': url, 'title': title, 'key': key, 'relevance': relevance})
+    return accepted
+
+
+def search_product_urls(query: str, website: str, max_results: int = 100,
+                        filters: Optional[ProductFilters] = None,
+                        on_page: Optional[Callable[[List[Dict]], bool]] = None) -> List[Dict[str, str]]:
+    """
+    Search Google for PRODUCT pages only (skip category pages)
+    
+    With filters, each result is scored on its title, snippet and pagemap;
+    clearly irrelevant ones are dropped and the rest come back best-first.
+    `on_page` receives each result page's new items (best-first within the
+    page) as soon as they are accepted; returning False ends the search.
+    """
     if not GOOGLE_API_KEY or not GOOGLE_CX:
         print("❌ Google API not configured!")
         return []
@@ -96,51 +283,143 @@ def search_product_urls(query: str, website: str, max_results: int = 100) -> Lis
     site_domain = website_config['domain']
     
     all_urls = []
-    num_requests = min((max_results + 9) // 10, 10)
+    seen_keys = set()
+    counts = {'skipped': 0, 'duplicates': 0}
+    wanted = max_results if filters is None else int(max_results * CSE_OVERFETCH + 0.5)
+    start_indexes = list(range(1, CSE_MAX_PAGES * 10 + 1, 10))
     
-    for start_index in range(1, num_requests * 10 + 1, 10):
-        try:
-            params = {
-                'key': GOOGLE_API_KEY,
-                'cx': GOOGLE_CX,
-                'q': f'{query} site:{site_domain}',
-                'start': start_index,
-                'num': 10,
-                'gl': 'in',
-                'hl': 'en'
-            }
-            
-            response = requests.get(
-                'https://www.googleapis.com/customsearch/v1',
-                params=params,
-                timeout=10
-            )
+    # Sliding window of concurrent page requests, consumed in page order so
+    # ranking stays stable. The window only reaches as far as the pages still
+    # needed at 10 results each (every CSE call is billed); pages past the stop
+    # point that have not started are cancelled
+    with ThreadPoolExecutor(max_workers=CSE_CONCURRENCY) as executor:
+        futures = {}
+        
+        for page_no, start_index in enumerate(start_indexes):
+            needed = max(1, -(-(wanted - len(all_urls)) // 10))
+            for ahead in range(page_no, min(page_no + min(CSE_CONCURRENCY, needed), len(start_indexes))):
+                if ahead not in futures:
+                    futures[ahead] = executor.submit(fetch_search_page, query, site_domain, start_indexes[ahead])
             
-            if response.status_code != 200:
-                print(f"   ⚠️ Status {response.status_code}, stopping pagination")
+            items = futures[page_no].result()
+            if items is None:
                 break
-            
-            data = response.json()
-            if 'items' not in data:
+            if not items:
                 print(f"   ℹ️ No more results at index {start_index}")
                 break
             
-            for item in data['items']:
-                url = item.get('link', '')
-                title = item.get('title', '')
-                
-                # ONLY accept actual product pages
-                if is_product_page(url, site_domain):
-                    all_urls.append({'url': url, 'title': title})
+            accepted = accept_search_items(items, site_domain, filters, seen_keys, counts)
+            all_urls.extend(accepted)
             
-            print(f"   Found: {len(data['items'])} URLs (Products: {len(all_urls)})")
-            time.sleep(0.5)  # Rate limiting
+            print(f"   Found: {len(items)} URLs (Products: {len(all_urls)}, "
+                  f"irrelevant: {counts['skipped']}, duplicates: {counts['duplicates']})")
             
-        except Exception as e:
-            print(f"❌ Search Error: {e}")
-            break
+            if on_page is not None and not on_page(_best_first(accepted)):
+                break
+            if len(all_urls) >= wanted:
+                print(f"   ⏹️ Enough product URLs after {page_no + 1} page(s)")
+                break
+        
+        for future in futures.values():
+            future.cancel()
     
-    print(f"✅ Total Product URLs: {len(all_urls)}")
+    # Best matches get the scrape budget first
+    all_urls = _best_first(all_urls)
+    
+    print(f"✅ Total Product URLs: {len(all_urls)} ({counts['skipped']} skipped as irrelevant)")
+    return all_urls
+
+
+def _best_first(items: List[Dict]) -> List[Dict]:
+    """Scored items by relevance (stable, so CSE order breaks ties); unscored ones as they are"""
+    if items and 'relevance' in items[0]:
+        return sorted(items, key=lambda u: u['relevance'], reverse=True)
+    return items
+
+
+def search_planned_urls(filters: ProductFilters, website: str, max_results: int = 100,
+                        on_page: Optional[Callable[[List[Dict]], bool]] = None) -> List[Dict[str, str]]:
+    """
+    Search with one targeted sub-query per brand (and gender) instead of a single joined query
+    
+    Every sub-query's first result page is fetched at once; after that each
+    round gives sub-queries a share of the remaining URL budget in proportion
+    to their yield (relevant new products per page so far) and fetches the next
+    page of those still short of their share. Results are scored against the
+    full filters, deduped across sub-queries and merged best-first; `on_page`
+    works as in search_product_urls.
+    """
+    plan = plan_queries(filters)
+    if len(plan) == 1:
+        return search_product_urls(build_search_query(filters), website, max_results, filters, on_page)
+    if not GOOGLE_API_KEY or not GOOGLE_CX:
+        print("❌ Google API not configured!")
+        return []
+    
+    site_domain = WEBSITES.get(website.lower(), WEBSITES['flipkart'])['domain']
+    queries = [build_search_query(sub) for sub in plan]
+    print(f"\n🧭 Query plan: {len(queries)} sub-queries on {website}")
+    
+    wanted = int(max_results * CSE_OVERFETCH + 0.5)
+    found: List[List[Dict]] = [[] for _ in queries]
+    pages = [0] * len(queries)
+    exhausted = [False] * len(queries)
+    seen_keys = set()
+    counts = {'skipped': 0, 'duplicates': 0}
+    calls = 0
+    
+    def fetch_next(i: int):
+        return fetch_search_page(queries[i], site_domain, pages[i] * 10 + 1)
+    
+    with ThreadPoolExecutor(max_workers=CSE_CONCURRENCY) as executor:
+        batch = list(range(len(queries)))
+        halted = False
+        while batch:
+            # Results are taken in plan order so cross-query dedupe is deterministic
+            for i, items in zip(batch, executor.map(fetch_next, batch)):
+                calls += 1
+                pages[i] += 1
+                if not items:
+                    exhausted[i] = True
+                    continue
+                accepted = accept_search_items(items, site_domain, filters, seen_keys, counts)
+                found[i].extend(accepted)
+                if len(items) < 10 or pages[i] >= CSE_MAX_PAGES:
+                    exhausted[i] = True
+                if on_page is not None and not on_page(_best_first(accepted)):
+                    halted = True
+                    break
+            
+            total = sum(len(f) for f in found)
+            open_queries = [i for i in range(len(queries)) if not exhausted[i]]
+            if halted or total >= wanted or not open_queries:
+                break
+            # Laplace-smoothed yield, so a query with one poor page keeps a small share
+            yields = [(len(found[i]) + 1) / (pages[i] * 10 + 2) for i in range(len(queries))]
+            caps = [len(found[i]) if exhausted[i] else float('inf') for i in range(len(queries))]
+            shares = share_budget(wanted, yields, caps)
+            short = [i for i in open_queries if len(found[i]) < shares[i]] or open_queries
+            # Only as many next pages as the remaining need is expected to take, best yield first
+            batch, expected = [], 0.0
+            for i in sorted(short, key=lambda i: yields[i], reverse=True):
+                if expected >= wanted - total:
+                    break
+                batch.append(i)
+                expected += yields[i] * 10
+    
+    for query, results, n in zip(queries, found, pages):
+        print(f"   • '{query}': {len(results)} products from {n} page(s)")
+    
+    # Best relevance first; ties alternate between sub-queries by their own rank
+    merged = [
+        (-item['relevance'], rank, i, item)
+        for i, results in enumerate(found)
+        for rank, item in enumerate(results)
+    ]
+    merged.sort(key=lambda entry: entry[:3])
+    all_urls = [entry[3] for entry in merged]
+    print(f"✅ Total Product URLs: {len(all_urls)} from {calls} search calls "
+          f"({counts['skipped']} skipped as irrelevant, {counts['duplicates']} duplicates)")
     return all_urls
 
 
@@ -148,81 +427,216 @@ def search_product_urls(query: str, website: str, max_results: int = 100) -> Lis
 # STEP 2: SCRAPE PRODUCT PAGES
 # ============================================================================
 
-def scrape_product_page(url: str, timeout: int = 20) -> Optional[str]:
-    """Scrape individual product page for full details"""
+async def wait_until_ready(page: Page, url: str, timeout: float = READY_TIMEOUT) -> bool:
+    """Wait for the site's title/price selectors, falling back to a timeout"""
+    site = site_for_url(url)
+    selectors = WEBSITES[site].get('ready_selectors') if site else None
+    
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        if selectors:
+            await page.wait_for_function(
+                'groups => groups.every(g => document.querySelector(g))',
+                arg=selectors,
+                timeout=timeout * 1000
             )
-            page = context.new_page()
-            
-            page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
-            time.sleep(3)
-            
-            # Scroll to load images and details
-            for i in range(3):
-                page.evaluate(f'window.scrollBy(0, {500 + i * 200})')
-                time.sleep(0.3)
-            
-            html = page.content()
-            browser.close()
-            
-            return html
-            
-    except Exception as e:
-        print(f"   ⚠️ Scrape failed: {str(e)[:50]}")
-        return None
+        else:
+            await page.wait_for_load_state('load', timeout=timeout * 1000)
+        return True
+    except PlaywrightTimeoutError:
+        print(f"   ⏱️ Not ready after {timeout}s, using partial render: {url[:60]}")
+        return False
+
+
+async def load_product_page(pool: BrowserPool, url: str, timeout: int = 20) -> str:
+    """Render a product page on a pooled browser page and return its HTML"""
+    async with pool.page() as page:
+        await page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
+        await wait_until_ready(page, url)
+        
+        # One scroll so lazy-loaded images get their real src attributes
+        await page.evaluate('window.scrollBy(0, 1200)')
+        
+        return await page.content()
 
 
-def scrape_multiple_products(urls: List[Dict[str, str]], max_workers: int = 15) -> List[Dict[str, str]]:
-    """Scrape multiple product pages in parallel"""
-    print(f"\n⚡ Scraping {len(urls)} product pages (workers: {max_workers})...")
+async def scrape_product_page_async(pool: BrowserPool, url: str, timeout: int = 20,
+                                    stats: Optional[FetchStats] = None) -> Optional[str]:
+    """
+    Tiered fetch: plain HTTP first, headless browser only if the HTML lacks product data
     
-    results = []
+    Runs inside a domain_scheduler slot, so the site's rate / in-flight limits
+    apply; a captcha or block page counts as 'blocked' and backs the domain off.
+    """
+    stats = stats or FETCH_STATS
+    escalated = False
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {executor.submit(scrape_product_page, item['url']): item for item in urls}
+    async with domain_scheduler.slot(url) as slot:
+        if HTTP_FAST_PATH:
+            start = time.time()
+            html = await fetch_http_async(url)
+            if has_product_signal(html, site_for_url(url)):
+                stats.record('http', time.time() - start)
+                return html
+            escalated = True
         
-        for idx, future in enumerate(as_completed(future_to_url), 1):
-            item = future_to_url[future]
-            try:
-                html = future.result()
-                if html:
-                    results.append({
-                        'url': item['url'],
-                        'title': item['title'],
-                        'html': html
-                    })
-                    print(f"   ✅ {idx}/{len(urls)}")
-                else:
-                    print(f"   ⚠️ {idx}/{len(urls)} - No HTML returned")
-            except Exception as e:
-                print(f"   ❌ {idx}/{len(urls)} - {str(e)[:50]}")
+        async def hedged_load() -> str:
+            # The duplicate is a fetch of its own - it waits for its own domain slot
+            async with domain_scheduler.slot(url):
+                return await load_product_page(pool, url, timeout)
+        
+        start = time.time()
+        try:
+            # Slow loads get a duplicate attempt on another idle pooled context
+            # (never while the domain is backing off)
+            html = await hedge_controller.run(
+                url,
+                lambda: load_product_page(pool, url, timeout),
+                can_hedge=lambda: pool.stats()['idle'] > 0 and not domain_scheduler.backing_off(url),
+                hedge_attempt=hedged_load
+            )
+        except Exception as e:
+            slot.outcome = 'failed'
+            stats.record('failed', time.time() - start, escalated=escalated)
+            print(f"   ⚠️ Scrape failed: {str(e)[:50]}")
+            return None
+        
+        if is_blocked_page(html):
+            slot.outcome = 'blocked'
+            stats.record('failed', time.time() - start, escalated=escalated)
+            print(f"   🚧 Blocked/captcha page: {url[:60]}")
+            return None
+        
+        stats.record('browser', time.time() - start, escalated=escalated)
+        return html
+
+
+def scrape_product_page(url: str, timeout: int = 20) -> Optional[str]:
+    """Scrape individual product page for full details (borrows from the browser pool)"""
+    runtime = get_runtime()
+    return runtime.run(scrape_product_page_async(runtime.pool, url, timeout))
+
+
+async def scrape_multiple_products_async(urls: List[Dict[str, str]], concurrency: int = SCRAPE_CONCURRENCY,
+                                        max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Scrape multiple product pages concurrently on the pool event loop (one fetch per canonical product)
+    
+    `max_workers` is still accepted as the old name of `concurrency`.
+    """
+    concurrency = max_workers or concurrency
+    runtime = get_runtime()
+    return await runtime.submit(_scrape_pages(runtime.pool, urls, concurrency))
+
+
+async def _scrape_pages(pool: BrowserPool, urls: List[Dict[str, str]], concurrency: int) -> List[Dict]:
+    unique = dedupe_urls(urls)
+    if len(unique) < len(urls):
+        print(f"   🔗 {len(urls) - len(unique)} duplicate product URLs dropped")
+    urls = unique
+    print(f"\n⚡ Scraping {len(urls)} product pages (concurrency: {concurrency}, browser pages: {pool.capacity})...")
     
-    print(f"✅ Scraped: {len(results)}/{len(urls)} pages")
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = FetchStats()
+    results = []
+    done = 0
+    
+    async def scrape_one(item: Dict[str, str]):
+        nonlocal done
+        async with semaphore:
+            parsed = await fetch_and_reduce(pool, item['url'], stats)
+        done += 1
+        if parsed:
+            results.append({
+                'url': item['url'],
+                'title': item['title'],
+                'parsed': parsed
+            })
+            print(f"   ✅ {done}/{len(urls)}")
+        else:
+            print(f"   ⚠️ {done}/{len(urls)} - No HTML returned")
+    
+    await asyncio.gather(*(scrape_one(item) for item in urls))
+    
+    FETCH_STATS.merge(stats)
+    stats.report()
+    print(f"✅ Scraped: {len(results)}/{len(urls)} pages (raw HTML peak {html_budget.stats()['peak_mb']} MB)")
     return results
 
 
+def scrape_multiple_products(urls: List[Dict[str, str]], concurrency: int = SCRAPE_CONCURRENCY,
+                             max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Scrape multiple product pages in parallel (one fetch per canonical product)
+    
+    Pages come back already reduced ({'url', 'title', 'parsed'}); the raw HTML
+    is dropped on arrival (or kept in html_spill_store with SCRAPER_SPILL_HTML=1).
+    `max_workers` is still accepted as the old name of `concurrency`.
+    """
+    concurrency = max_workers or concurrency
+    runtime = get_runtime()
+    return runtime.run(_scrape_pages(runtime.pool, urls, concurrency))
+
+
 # ============================================================================
 # STEP 3: EXTRACT WITH AI (FILTER MATCHING)
 # ============================================================================
 
 def clean_html(html: str) -> str:
-    """Clean HTML for AI"""
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'iframe', 'svg']):
-        tag.decompose()
-    
-    product_sections = soup.find_all(['div', 'article'], class_=lambda x: x and any(
-        k in str(x).lower() for k in ['product', 'detail', 'info', 'item']
-    ))
+    """Reduce HTML to compact, ranked page text for AI (see app/html_reducer.py)"""
+    return reduce_html(html, max_tokens=PAGE_TOKEN_BUDGET)
+
+
+async def parse_scraped_page(html: str, url: str) -> Dict:
+    """Structured fields + reduced text, computed in the parse process pool"""
+    return await parse_pool.parse(html, site_for_url(url), PAGE_TOKEN_BUDGET)
+
+
+def _keep_raw_html(url: str, html: str):
+    """Spill and/or archive a fetched page (runs off the event loop)"""
+    try:
+        if SPILL_HTML:
+            html_spill_store.put(url, html)
+        if ARCHIVE_PAGES:
+            page_archive.put(url, html, site=site_for_url(url))
+    except OSError as e:
+        print(f"   ⚠️ Keeping raw HTML failed: {str(e)[:50]}")
+
+
+async def fetch_and_reduce(pool: Optional[BrowserPool], url: str, stats: Optional[FetchStats] = None,
+                           budget: Optional[MemoryBudget] = None, replay: bool = False) -> Optional[Dict]:
+    """
+    Fetch a page and reduce it right away; None if the fetch or parse failed
     
-    cleaned = '\n'.join([str(s) for s in product_sections[:50]]) if product_sections else str(soup.find('body') or soup)
-    return cleaned[:80000]
+    The raw HTML only lives between fetch and reduction and counts against the
+    memory budget (html_budget by default) while it does, so in-flight HTML
+    stays under SCRAPER_HTML_MEMORY_MB however many pages are requested.
+    With replay, the page comes from the archive instead of the network.
+    """
+    budget = budget or html_budget
+    reserved = await budget.reserve(budget.estimate)
+    try:
+        if replay:
+            html = await asyncio.to_thread(page_archive.latest, url)
+        else:
+            html = await scrape_product_page_async(pool, url, stats=stats)
+        if not html:
+            return None
+        reserved = budget.resize(reserved, len(html))
+        
+        keep = None
+        if not replay and (SPILL_HTML or ARCHIVE_PAGES):
+            keep = asyncio.create_task(asyncio.to_thread(_keep_raw_html, url, html))
+        try:
+            parsed = await parse_scraped_page(html, url)
+        except Exception as e:
+            print(f"   ⚠️ Parse failed: {str(e)[:50]}")
+            parsed = None
+        if keep is not None:
+            await keep
+        return parsed
+    finally:
+        await budget.release(reserved)
+
 
 def extract_price_from_text(text: str) -> float:
     """Extract numeric price from text with currency symbols"""
@@ -243,12 +657,115 @@ def extract_price_from_text(text: str) -> float:
     except:
         return 0.0
 
-def extract_product_with_filters(html: str, url: str, title: str, filters: ProductFilters) -> Optional[Dict]:
-    """Extract product and validate against filters"""
+
+extraction_cache = ExtractionCache(
+    EXTRACTION_CACHE_PATH,
+    ttl=EXTRACTION_CACHE_TTL,
+    max_bytes=EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+)
+page_cache = ExtractionCache(PAGE_CACHE_PATH, ttl=PAGE_CACHE_TTL)
+_LLM_FAILED = object()
+
+llm_limiter = AdaptiveLimiter(
+    rpm=OPENAI_RPM_LIMIT,
+    tpm=OPENAI_TPM_LIMIT,
+    initial=LLM_INITIAL_CONCURRENCY,
+    maximum=EXTRACT_CONCURRENCY
+)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from Retry-After / retry-after-ms headers of an OpenAI error"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+def llm_chat_completion(**kwargs):
+    """openai chat completion behind the adaptive limiter, retried on 429s, timeouts and 5xx"""
+    est_tokens = sum(estimate_tokens(m['content']) for m in kwargs['messages']) + kwargs.get('max_tokens', 0)
+    
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        entry = llm_limiter.acquire(est_tokens)
+        try:
+            response = openai.chat.completions.create(timeout=LLM_TIMEOUT, **kwargs)
+        except openai.RateLimitError as e:
+            if getattr(e, 'code', None) == 'insufficient_quota':
+                llm_limiter.release(entry, 'error')
+                raise
+            retry_after = _retry_after(e)
+            llm_limiter.release(entry, 'throttled', retry_after=retry_after)
+            outcome = '429'
+        except (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as e:
+            retry_after = _retry_after(e)
+            llm_limiter.release(entry, 'timeout', retry_after=retry_after)
+            outcome = type(e).__name__
+        except Exception:
+            llm_limiter.release(entry, 'error')
+            raise
+        else:
+            usage = getattr(response, 'usage', None)
+            llm_limiter.release(entry, 'ok', tokens=getattr(usage, 'total_tokens', None))
+            return response
+        
+        if attempt == LLM_MAX_RETRIES:
+            raise RuntimeError(f"LLM call failed after {attempt + 1} attempts ({outcome})")
+        delay = retry_after or min(2 ** attempt, 30) + random.random()
+        print(f"   🐢 LLM {outcome}, retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s "
+              f"(concurrency limit {llm_limiter.limit:.1f})")
+        time.sleep(delay)
+
+
+def normalize_filters(filters: ProductFilters) -> str:
+    """Canonical JSON for filters - order and case of list values don't change the key"""
+    def norm_list(values):
+        return sorted({v.strip().lower() for v in values or [] if v and v.strip()})
+    
+    price_range = None
+    if filters.price_range:
+        price_range = [filters.price_range.min or 0, filters.price_range.max]
     
-    cleaned_html = clean_html(html)
+    return json.dumps({
+        'brand': norm_list(filters.brand),
+        'size': norm_list(filters.size),
+        'color': norm_list(filters.color),
+        'gender': norm_list(filters.gender),
+        'category': (filters.category or '').strip().lower(),
+        'price_range': price_range,
+    }, sort_keys=True)
+
+
+def extraction_cache_key(cleaned_html: str, filters: ProductFilters) -> str:
+    return ExtractionCache.make_key(cleaned_html, normalize_filters(filters), PROMPT_VERSION, LLM_MODEL)
+
+
+def extract_product_with_llm(cleaned_html: str, url: str, filters: ProductFilters,
+                             known: Optional[Dict] = None) -> Optional[Dict]:
+    """Ask the LLM for the product on this page (raw, unvalidated dict, cached by content)"""
+    cache_key = extraction_cache_key(cleaned_html, filters)
+    cached = extraction_cache.get(cache_key)
+    if cached is not ExtractionCache.MISS:
+        print(f"   ⚡ Extraction cache hit: {url[:60]}")
+        if isinstance(cached, dict):
+            cached['product_url'] = url
+        return cached
     
-    # Build filter criteria
+    product = _call_extraction_llm(cleaned_html, url, filters)
+    if product is not _LLM_FAILED:
+        product = complete_answer(product, cleaned_html, url, known)
+        extraction_cache.set(cache_key, product)
+        return product
+    return None
+
+
+def _filters_prompt(filters: ProductFilters) -> str:
+    """FILTERS TO MATCH block shared by the single- and multi-page prompts"""
     brands = filters.brand or []
     sizes = filters.size or []
     colors = filters.color or []
@@ -260,30 +777,21 @@ def extract_product_with_filters(html: str, url: str, title: str, filters: Produ
     colors_str = ', '.join(colors) if colors else 'any color'
     genders_str = ', '.join(genders) if genders else 'any gender'
     
-
     price_range_str = ""
     if filters.price_range:
         min_p = filters.price_range.min or 0
         max_p = filters.price_range.max or "any"
         price_range_str = f"\n    - Price Range: ₹{min_p} to ₹{max_p}"
     
-    prompt = f"""
-Extract product from this e-commerce page.
-
-URL: {url}
-
-    
-FILTERS TO MATCH:
+    return f"""FILTERS TO MATCH:
     - Brand: One of {brands_str}
     - Size: Must have size {sizes_str} OR "All Sizes" OR size range including these
     - Color: {colors_str} (FLEXIBLE - match "Black", "Noir", "Negro", "Dark" for Black)
     - Gender: {genders_str}
-    - Category: {category if category else 'footwear/slippers/shoes'}{price_range_str}
+    - Category: {category if category else 'footwear/slippers/shoes'}{price_range_str}"""
 
-HTML (first 60000 chars):
-{cleaned_html[:60000]}
 
-MATCHING RULES:
+MATCHING_RULES = """MATCHING RULES:
 1. Brand: FLEXIBLE - "Nike", "NIKE", "nike" all match
 2. Size: If product shows "9 UK" or "Size 9" or "All sizes available" → ACCEPT
 3. Color: FLEXIBLE - For Black accept: "Black", "Noir", "Negro", "Dark", "Onyx"
@@ -292,16 +800,41 @@ MATCHING RULES:
    - If "Out of Stock" OR "Currently Unavailable" OR "Notify Me" → in_stock = false, availability_status = "out_of_stock"
    - If "Only X left" OR "Limited Stock" → in_stock = true, availability_status = "limited_stock"
    - DEFAULT to in_stock = true if no clear unavailability message found
-5. DO NOT reject out of stock products - include them with correct status
+5. DO NOT reject out of stock products - include them with correct status"""
+
+
+def _call_extraction_llm(cleaned_html: str, url: str, filters: ProductFilters,
+                         max_tokens: int = LLM_MAX_TOKENS):
+    """
+    Single extraction chat completion; _LLM_FAILED on API or parse errors
+
+    An answer cut off at max_tokens may hold a clipped price or name, so it is
+    asked again once with LLM_RETRY_MAX_TOKENS and otherwise counts as failed
+    (never cached).
+    """
+    brands_str = ', '.join(filters.brand) if filters.brand else 'any brand'
+    
+    prompt = f"""
+Extract product from this e-commerce page.
+
+URL: {url}
+
+    
+{_filters_prompt(filters)}
 
-Extract ALL product details visible on page.
+PAGE CONTENT (reduced text, key: value data and product image URLs):
+{cleaned_html}
 
-Return JSON:
+{MATCHING_RULES}
+
+Extract ALL product details visible on page. Use null for anything not on the page.
+
+Return JSON {{"product": ...}} where product is:
 {{
     "name": "Full product name",
     "brand": "Nike",
-    "price": "1299" or "₹1,299" or "Rs. 1299.00",
-    "original_price": "1999" or "₹1,999" or "Rs. 1999.00",
+    "price": 1299,
+    "original_price": 1999,
     "discount": 35,
     "image_url": "https://image-url.jpg",
     "product_url": "{url}",
@@ -316,7 +849,7 @@ Return JSON:
     "category": "slippers"
 }}
 
-Return null ONLY if:
+product is null ONLY if:
 - Completely wrong brand (not {brands_str})
 - Wrong category (shoes when searching slippers)
 - Page is not a product page
@@ -329,167 +862,424 @@ Be FLEXIBLE with size and color matching. Extract ALL products regardless of sto
 """
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
+        response = llm_chat_completion(
+            model=LLM_MODEL,
             messages=[
                 {"role": "system", "content": "Extract product even if out of stock. Return JSON or null only if completely irrelevant."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.1,
-            max_tokens=1000
+            max_tokens=max_tokens,
+            response_format=single_product_format()
         )
-        
-        ai_output = response.choices[0].message.content.strip()
-        ai_output = ai_output.replace('```json', '').replace('```', '').strip()
-        
-        if ai_output.lower() == 'null' or not ai_output:
-            return None
-        
-        product = json.loads(ai_output)
-        
-        # More lenient validation - don't drop products easily
-        # Validate brand (more flexible)
-        if brands:
-            product_brand = str(product.get('brand', '')).lower()
-            product_name = str(product.get('name', '')).lower()
-            brand_match = any(
-                b.lower() in product_brand or b.lower() in product_name 
-                for b in brands
-            )
-            if not brand_match:
-                print(f"   ⚠️ Brand mismatch: {product.get('brand')} not in {brands}")
-                return None
-            
-        # Fix stock status - default to true if not explicitly false
-        if 'in_stock' not in product or product.get('in_stock') is None:
-            product['in_stock'] = True
-            print(f"   ℹ️ Stock status not found, defaulting to in_stock=True")
-        
-        # Ensure boolean type
-        product['in_stock'] = bool(product.get('in_stock', True))
-
-        # Size validation - accept if size mentioned anywhere
-        if sizes:
-            product_size = str(product.get('size', '')).lower()
-            # Accept if any filter size is mentioned, or "all sizes"
-            if 'all' not in product_size:
-                size_match = any(s.lower() in product_size for s in sizes)
-                if not size_match:
-                    print(f"   ℹ️ Size mismatch: {product.get('size')} not matching {sizes}")
-                    # Don't reject, just log
-
-        # Color validation - flexible matching
-        if colors:
-            product_color = str(product.get('colour', '')).lower()
-            # Flexible color matching
-            color_variants = {
-                'black': ['black', 'noir', 'negro', 'dark', 'onyx'],
-                'white': ['white', 'blanc', 'blanco', 'off-white'],
-                'blue': ['blue', 'bleu', 'azul', 'navy'],
-                'red': ['red', 'rouge', 'rojo', 'maroon'],
-                'grey': ['grey', 'gray', 'gris', 'silver'],
-                'brown': ['brown', 'tan', 'beige', 'marron']
-            }
-            
-            color_match = False
-            for filter_color in colors:
-                fc_lower = filter_color.lower()
-                variants = color_variants.get(fc_lower, [fc_lower])
-                if any(v in product_color for v in variants):
-                    color_match = True
-                    break
-            
-            if not color_match:
-                print(f"   ℹ️ Color mismatch: {product.get('colour')} not matching {colors}")
-                # Don't reject, just log
-        
-          # Normalize prices - extract numbers from text FIRST
-        if 'price' in product:
-            product['price'] = extract_price_from_text(product.get('price', 0))
-        
-        if 'original_price' in product:
-            product['original_price'] = extract_price_from_text(product.get('original_price', 0))
-        
-        # Log stock status for debugging
-        stock_status = product.get('in_stock', True)
-        availability = product.get('availability_status', 'unknown')
-        print(f"   📦 Stock: in_stock={stock_status}, status={availability}")
-        
-        # Price range validation AFTER normalization
-        if filters.price_range:
-            product_price = float(product.get('price', 0))
-            min_price = filters.price_range.min or 0
-            max_price = filters.price_range.max
-            
-            if product_price < min_price:
-                print(f"   ℹ️ Price too low: ₹{product_price} < ₹{min_price}")
-                return None
-            
-            if max_price and product_price > max_price:
-                print(f"   ℹ️ Price too high: ₹{product_price} > ₹{max_price}")
-                return None
-        
-        # NOW validate price range with numeric values
-        if filters.price_range:
-            product_price = product.get('price', 0)
-            min_price = filters.price_range.min or 0
-            max_price = filters.price_range.max
-            
-            if product_price < min_price:
-                print(f"   ℹ️ Price too low: ₹{product_price} < ₹{min_price}")
-                return None
-            
-            if max_price and product_price > max_price:
-                print(f"   ℹ️ Price too high: ₹{product_price} > ₹{max_price}")
-                return None
-        
-        # Set availability_status if not present
-        if 'availability_status' not in product:
-            product['availability_status'] = "in_stock" if product.get('in_stock', True) else "out_of_stock"
-        
-        return product
-        
     except Exception as e:
+        # Not cached - a transient API failure must not stick
+        EXTRACTION_FAILURES.record('api_error')
         print(f"   ⚠️ AI Error: {e}")
+        return _LLM_FAILED
+    
+    choice = response.choices[0]
+    if choice.finish_reason == 'length':
+        EXTRACTION_FAILURES.record('truncated')
+        if max_tokens < LLM_RETRY_MAX_TOKENS:
+            print(f"   ✂️ Truncated answer, asking again: {url[:50]}")
+            return _call_extraction_llm(cleaned_html, url, filters, LLM_RETRY_MAX_TOKENS)
+        return _LLM_FAILED
+    data = parse_answer(choice.message.content)
+    if data is _LLM_FAILED:
+        return _LLM_FAILED
+    if isinstance(data, dict) and 'product' in data:
+        data = data['product']
+    return coerce_product(data)
+
+
+def parse_answer(content: Optional[str]):
+    """Parse a model answer, repairing it locally when needed; _LLM_FAILED if unusable"""
+    try:
+        return json.loads(content)
+    except (TypeError, ValueError):
+        EXTRACTION_FAILURES.record('invalid_json')
+    try:
+        data = parse_llm_json(content)
+    except ValueError as e:
+        EXTRACTION_FAILURES.record('unrepairable')
+        print(f"   ⚠️ Unusable AI output: {str(e)[:60]}")
+        return _LLM_FAILED
+    EXTRACTION_FAILURES.record('repaired')
+    return data
+
+
+def _reask_fields(cleaned_html: str, url: str, fields: List[str]) -> Optional[Dict]:
+    """Small follow-up call asking only for the fields the first answer lacked"""
+    prompt = f"""
+From this product page, extract ONLY these fields: {', '.join(fields)}.
+Use null for a field that is really not on the page.
+
+URL: {url}
+
+PAGE CONTENT:
+{cleaned_html}
+"""
+    try:
+        response = llm_chat_completion(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=200,
+            response_format=fields_format(fields)
+        )
+    except Exception as e:
+        print(f"   ⚠️ Re-ask error: {str(e)[:60]}")
         return None
+    data = parse_answer(response.choices[0].message.content)
+    return coerce_product(data) if data is not _LLM_FAILED else None
+
+
+def complete_answer(product: Optional[Dict], cleaned_html: str, url: str,
+                    known: Optional[Dict] = None) -> Optional[Dict]:
+    """Fill required fields missing from both the answer and `known` with a targeted re-ask"""
+    if not product:
+        return product
+    missing = missing_answer_fields(product, known)
+    if not missing:
+        return product
+    
+    EXTRACTION_FAILURES.record('missing_fields')
+    answer = _reask_fields(cleaned_html, url, missing)
+    filled = {k: v for k, v in (answer or {}).items() if k in missing}
+    EXTRACTION_FAILURES.record('reask_ok' if filled else 'reask_failed')
+    if filled:
+        print(f"   🔁 Re-asked {', '.join(filled)}: {url[:50]}")
+    return {**product, **filled}
 
 
-def extract_products_batch(scraped_pages: List[Dict], filters: ProductFilters, batch_size: int = 10) -> List[Dict]:
-    """Process products in batches to reduce latency"""
-    print(f"\n🤖 Extracting products in batches of {batch_size}...")
+def validate_product_against_filters(product: Dict, filters: ProductFilters) -> Optional[Dict]:
+    """Normalize an extracted product and drop it if it fails the filters"""
+    brands = filters.brand or []
+    sizes = filters.size or []
+    colors = filters.color or []
+    
+    # More lenient validation - don't drop products easily
+    # Validate brand (more flexible)
+    if brands:
+        product_brand = str(product.get('brand', '')).lower()
+        product_name = str(product.get('name', '')).lower()
+        brand_match = any(
+            b.lower() in product_brand or b.lower() in product_name 
+            for b in brands
+        )
+        if not brand_match:
+            print(f"   ⚠️ Brand mismatch: {product.get('brand')} not in {brands}")
+            return None
+    
+    # Fix stock status - default to true if not explicitly false
+    if 'in_stock' not in product or product.get('in_stock') is None:
+        product['in_stock'] = True
+        print(f"   ℹ️ Stock status not found, defaulting to in_stock=True")
+    
+    # Ensure boolean type
+    product['in_stock'] = bool(product.get('in_stock', True))
+    
+    # Size validation - accept if size mentioned anywhere
+    if sizes:
+        product_size = str(product.get('size', '')).lower()
+        # Accept if any filter size is mentioned, or "all sizes"
+        if 'all' not in product_size:
+            size_match = any(s.lower() in product_size for s in sizes)
+            if not size_match:
+                print(f"   ℹ️ Size mismatch: {product.get('size')} not matching {sizes}")
+                # Don't reject, just log
+    
+    # Color validation - flexible matching
+    if colors:
+        product_color = str(product.get('colour', '')).lower()
+        # Flexible color matching
+        color_variants = {
+            'black': ['black', 'noir', 'negro', 'dark', 'onyx'],
+            'white': ['white', 'blanc', 'blanco', 'off-white'],
+            'blue': ['blue', 'bleu', 'azul', 'navy'],
+            'red': ['red', 'rouge', 'rojo', 'maroon'],
+            'grey': ['grey', 'gray', 'gris', 'silver'],
+            'brown': ['brown', 'tan', 'beige', 'marron']
+        }
+    
+        color_match = False
+        for filter_color in colors:
+            fc_lower = filter_color.lower()
+            variants = color_variants.get(fc_lower, [fc_lower])
+            if any(v in product_color for v in variants):
+                color_match = True
+                break
+    
+        if not color_match:
+            print(f"   ℹ️ Color mismatch: {product.get('colour')} not matching {colors}")
+            # Don't reject, just log
+    
+    # Normalize prices - extract numbers from text FIRST
+    if 'price' in product:
+        product['price'] = extract_price_from_text(product.get('price', 0))
+    
+    if 'original_price' in product:
+        product['original_price'] = extract_price_from_text(product.get('original_price', 0))
+    
+    # Log stock status for debugging
+    stock_status = product.get('in_stock', True)
+    availability = product.get('availability_status', 'unknown')
+    print(f"   📦 Stock: in_stock={stock_status}, status={availability}")
+    
+    # Price range validation AFTER normalization
+    if filters.price_range:
+        product_price = float(product.get('price', 0))
+        min_price = filters.price_range.min or 0
+        max_price = filters.price_range.max
+    
+        if product_price < min_price:
+            print(f"   ℹ️ Price too low: ₹{product_price} < ₹{min_price}")
+            return None
+    
+        if max_price and product_price > max_price:
+            print(f"   ℹ️ Price too high: ₹{product_price} > ₹{max_price}")
+            return None
+    
+    # Set availability_status if not present
+    if 'availability_status' not in product:
+        product['availability_status'] = "in_stock" if product.get('in_stock', True) else "out_of_stock"
+    
+    return product
+
+
+def category_matches(product: Dict, category: str) -> bool:
+    """Loose keyword check of the requested category against name/category text"""
+    if not category:
+        return True
+    text = f"{product.get('name', '')} {product.get('category', '')}".lower()
+    keywords = [w.rstrip('s') for w in re.findall(r'[a-z]+', category.lower()) if len(w) > 3]
+    return not keywords or any(k in text for k in keywords)
+
+
+def resolve_structured(parsed: Dict, url: str, filters: ProductFilters):
+    """Structured fields for a parsed page and whether they are enough to skip the LLM"""
+    site = site_for_url(url)
+    structured = dict(parsed['structured'])
+    
+    # Brand is often only in the title - take it from the filter brands when present
+    if not structured.get('brand') and structured.get('name'):
+        name_lower = structured['name'].lower()
+        structured['brand'] = next((b for b in filters.brand or [] if b.lower() in name_lower), None)
+    
+    complete = not missing_fields(structured) and category_matches(structured, filters.category or '')
+    EXTRACTOR_COVERAGE.record(site, structured, complete)
+    return structured, complete
+
+
+def finish_product(product: Optional[Dict], structured: Dict, url: str, filters: ProductFilters,
+                   from_llm: bool = True) -> Optional[ProductRecord]:
+    """Merge LLM output with structured fields, validate against filters, pack into a record"""
+    if from_llm:
+        if not product:
+            return None
+        # Keep deterministic values for anything the model left empty
+        for key, value in structured.items():
+            if value is not None and not product.get(key):
+                product[key] = value
+    else:
+        product = {k: v for k, v in structured.items() if v is not None}
+        product['product_url'] = url
+        print(f"   🧩 Structured extraction ({site_for_url(url)}): {str(product['name'])[:40]}")
+    
+    product = validate_product_against_filters(product, filters)
+    return ProductRecord.from_dict(product) if product else None
+
+
+def extract_product_from_parsed(parsed: Dict, url: str, filters: ProductFilters) -> Optional[ProductRecord]:
+    """Extract product from a parsed page (structured data first, LLM fallback) and validate"""
+    structured, complete = resolve_structured(parsed, url, filters)
+    if complete:
+        return finish_product(None, structured, url, filters, from_llm=False)
+    product = extract_product_with_llm(parsed['reduced'], url, filters, structured)
+    return finish_product(product, structured, url, filters)
+
+
+def extract_product_with_filters(html: str, url: str, title: str, filters: ProductFilters) -> Optional[ProductRecord]:
+    """Extract product and validate against filters (parses inline)"""
+    parsed = parse_page(html, site_for_url(url), PAGE_TOKEN_BUDGET)
+    return extract_product_from_parsed(parsed, url, filters)
+
+
+def _call_batch_extraction_llm(pages: List[Dict], filters: ProductFilters):
+    """One chat completion for several reduced pages → {url: product or None}; _LLM_FAILED on errors"""
+    brands_str = ', '.join(filters.brand) if filters.brand else 'any brand'
+    page_blocks = '\n\n'.join(
+        f"=== PAGE {i} ===\nURL: {page['url']}\n{page['reduced']}" for i, page in enumerate(pages, 1)
+    )
+    
+    prompt = f"""
+Extract the product from EACH of the {len(pages)} e-commerce pages below.
+
+{_filters_prompt(filters)}
+
+{MATCHING_RULES}
+
+For every page return one entry. "product" is null ONLY if the page has a completely wrong
+brand (not {brands_str}), the wrong category, or is not a product page.
+NEVER return null for out-of-stock products - use in_stock: false, availability_status: "out_of_stock".
+
+Return JSON (null for any field not on the page):
+{{"products": [
+    {{"page": 1, "url": "<page URL exactly as given>", "product": {{
+        "name": "Full product name", "brand": "Nike", "price": 1299, "original_price": 1999,
+        "discount": 35, "image_url": "https://image-url.jpg", "product_url": "<page URL>",
+        "rating": 4.3, "reviews": 567, "gender": "Men", "size": "9 or size range", "colour": "Black",
+        "in_stock": true, "availability_status": "in_stock", "is_trending": false, "category": "slippers"
+    }}}}
+]}}
+
+{page_blocks}
+"""
+    
+    try:
+        response = llm_chat_completion(
+            model=LLM_MODEL,
+            messages=[
+                {"role": "system", "content": "Extract one product per page, even if out of stock. Return only the JSON object."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=min(400 * len(pages) + 200, 16000),
+            response_format=batch_products_format()
+        )
+    except Exception as e:
+        EXTRACTION_FAILURES.record('api_error')
+        print(f"   ⚠️ Batch AI Error ({len(pages)} pages): {str(e)[:80]}")
+        return _LLM_FAILED
+    
+    choice = response.choices[0]
+    truncated = choice.finish_reason == 'length'
+    if truncated:
+        EXTRACTION_FAILURES.record('truncated')
+    data = parse_answer(choice.message.content)
+    if data is _LLM_FAILED:
+        return _LLM_FAILED
+    entries = data.get('products', []) if isinstance(data, dict) else data
+    
+    results = {}
+    last_url = None
+    by_index = {i: page['url'] for i, page in enumerate(pages, 1)}
+    for entry in entries or []:
+        if not isinstance(entry, dict):
+            continue
+        url = entry.get('url') if entry.get('url') in by_index.values() else by_index.get(entry.get('page'))
+        if url:
+            results[url] = coerce_product(entry.get('product'))
+            last_url = url
+    
+    if truncated and last_url:
+        # Truncated output: the last entry may be cut short - let it be retried alone
+        results.pop(last_url, None)
+    return results
+
+
+def extract_products_multi_llm(pages: List[Dict], filters: ProductFilters) -> Dict[str, Optional[Dict]]:
+    """
+    Extract several reduced pages ({'url', 'reduced'}) with one LLM call
+    
+    Cached pages are answered from the extraction cache. Pages missing from
+    the model's answer (failed call, truncation, dropped entry) are retried
+    one by one with the single-page prompt. Answers lacking name/brand/price
+    that the structured extractors can't supply get one targeted re-ask.
+    """
+    results = {}
+    todo = []
+    for page in pages:
+        cache_key = extraction_cache_key(page['reduced'], filters)
+        cached = extraction_cache.get(cache_key)
+        if cached is not ExtractionCache.MISS:
+            if isinstance(cached, dict):
+                cached['product_url'] = page['url']
+            results[page['url']] = cached
+        else:
+            todo.append((page, cache_key))
+    
+    if len(todo) > 1:
+        answered = _call_batch_extraction_llm([page for page, _ in todo], filters)
+        print(f"   🤖 Batch of {len(todo)} pages → {0 if answered is _LLM_FAILED else len(answered)} answered")
+        if answered is not _LLM_FAILED:
+            for page, cache_key in todo:
+                if page['url'] in answered:
+                    product = complete_answer(answered[page['url']], page['reduced'], page['url'],
+                                              page.get('structured'))
+                    extraction_cache.set(cache_key, product)
+                    results[page['url']] = product
+                else:
+                    EXTRACTION_FAILURES.record('missing_entry')
+        todo = [(page, key) for page, key in todo if page['url'] not in results]
+    
+    for page, _ in todo:
+        results[page['url']] = extract_product_with_llm(page['reduced'], page['url'], filters, page.get('structured'))
+    
+    return results
+
+
+def pack_batches(items: List[Dict], token_budget: int = BATCH_TOKEN_BUDGET,
+                 max_pages: int = BATCH_MAX_PAGES) -> List[List[Dict]]:
+    """Greedily pack reduced pages into LLM batches under the prompt token budget"""
+    batches, current, tokens = [], [], 0
+    for item in items:
+        item_tokens = estimate_tokens(item['reduced'])
+        if current and (tokens + item_tokens > token_budget or len(current) >= max_pages):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(item)
+        tokens += item_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def extract_products_batch(scraped_pages: List[Dict], filters: ProductFilters, batch_size: int = BATCH_MAX_PAGES) -> List[ProductRecord]:
+    """Extract products with multi-page LLM calls (batch_size = max pages per call)"""
+    print(f"\n🤖 Extracting {len(scraped_pages)} products (up to {batch_size} pages per LLM call)...")
     
     all_products = []
-    total = len(scraped_pages)
     
-    for batch_start in range(0, total, batch_size):
-        batch_end = min(batch_start + batch_size, total)
-        batch = scraped_pages[batch_start:batch_end]
-        
-        print(f"\n   Batch {batch_start//batch_size + 1} ({batch_start+1}-{batch_end}/{total})...")
-        
-        # Process batch in parallel with ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {
-                executor.submit(
-                    extract_product_with_filters,
-                    page['html'],
-                    page['url'],
-                    page['title'],
-                    filters
-                ): page for page in batch
-            }
-            
-            for future in as_completed(futures):
-                try:
-                    product = future.result(timeout=15)
-                    if product:
-                        all_products.append(product)
-                        status = product.get('availability_status', 'unknown')
-                        print(f"      ✅ Match: {product['name'][:40]} [{status}]")
-                except Exception as e:
-                    print(f"      ⚠️ Error: {str(e)[:50]}")
+    # Pages from scrape_multiple_products arrive parsed; raw HTML is parsed in the process pool
+    futures = [
+        None if 'parsed' in page else parse_pool.submit(page['html'], site_for_url(page['url']), PAGE_TOKEN_BUDGET)
+        for page in scraped_pages
+    ]
+    needs_llm = []
+    for page, future in zip(scraped_pages, futures):
+        try:
+            parsed = page['parsed'] if future is None else future.result()
+        except Exception as e:
+            print(f"      ⚠️ Parse error: {str(e)[:50]}")
+            continue
+        structured, complete = resolve_structured(parsed, page['url'], filters)
+        if complete:
+            product = finish_product(None, structured, page['url'], filters, from_llm=False)
+            if product:
+                all_products.append(product)
+        else:
+            needs_llm.append({'url': page['url'], 'reduced': parsed['reduced'], 'structured': structured})
+    
+    # All batches go out at once (bounded by the executor) instead of batch-by-batch
+    batches = pack_batches(needs_llm, max_pages=batch_size)
+    with ThreadPoolExecutor(max_workers=EXTRACT_CONCURRENCY) as executor:
+        # llm_limiter decides how many of these threads actually call the API
+        futures = {executor.submit(extract_products_multi_llm, batch, filters): batch for batch in batches}
         
-        # Continue processing all batches - don't exit early
+        for future in as_completed(futures):
+            try:
+                answers = future.result()
+            except Exception as e:
+                print(f"      ⚠️ Error: {str(e)[:50]}")
+                continue
+            for item in futures[future]:
+                product = finish_product(answers.get(item['url']), item['structured'], item['url'], filters)
+                if product:
+                    all_products.append(product)
+                    status = product.get('availability_status', 'unknown')
+                    print(f"      ✅ Match: {str(product.get('name', ''))[:40]} [{status}]")
     
     return all_products
 
@@ -515,70 +1305,44 @@ def fix_amazon_image_url(url: str) -> str:
         return url
 
 
-def classify_product(product: Dict) -> str:
-    """Classify product as trending, top_selling, or normal"""
-    rating = product.get('rating', 0)
-    reviews = product.get('reviews', 0)
-    discount = product.get('discount', 0)
-    
-    # Trending: High discount + decent rating
-    if discount >= 30 and rating >= 4.0:
-        return ProductCategory.TRENDING.value
+def deduplicate_products(products: List[ProductRecord], cross_site: bool = False) -> List[ProductRecord]:
+    """Remove duplicates by canonical URL and near-duplicate name/price/image (MinHash + LSH)"""
+    index = NearDuplicateIndex(cross_site=cross_site)
+    unique = [p for p in products if index.add(p)]
     
-    # Top Selling: High reviews + high rating
-    if reviews >= 500 and rating >= 4.2:
-        return ProductCategory.TOP_SELLING.value
-    
-    return ProductCategory.NORMAL.value
+    print(f"   🔄 Deduplication: {len(products)} → {len(unique)} products ({index.comparisons} comparisons)")
+    return unique
 
 
-def deduplicate_products(products: List[Dict]) -> List[Dict]:
-    """Remove duplicates by URL and normalized name"""
-    seen_urls = set()
-    seen_names = set()
-    unique = []
+def enhance_and_sort(products: List[ProductRecord], website: Optional[str] = None,
+                     limit: Optional[int] = None, cross_site: bool = False) -> List[ProductRecord]:
+    """
+    Add metadata, classify, and sort by relevance (only the top `limit` records are filled in)
     
-    for p in products:
-        url = p.get('product_url', '')
-        
-        # Primary deduplication by URL
-        if url and url != '#' and url in seen_urls:
-            continue
-        
-        # Secondary deduplication by normalized name
-        name = p.get('name', '').lower().strip()
-        name = re.sub(r'\s+', ' ', name)  # Normalize whitespace
-        name = re.sub(r'[^\w\s]', '', name)  # Remove special chars
-        name_key = name[:50]
-        
-        if name_key and name_key in seen_names:
-            continue
-        
-        # Add to unique list
-        if url and url != '#':
-            seen_urls.add(url)
-        if name_key:
-            seen_names.add(name_key)
-        
-        unique.append(p)
+    Records that already carry a source_website (multi-site scrapes) keep it;
+    the rest are attributed to `website`. With cross_site, listings of the same
+    product on different sites are deduplicated regardless of price.
+    """
     
-    print(f"   🔄 Deduplication: {len(products)} → {len(unique)} products")
-    return unique
-
-
-def enhance_and_sort(products: List[Dict], website: str) -> List[Product]:
-    """Add metadata, classify, and sort by relevance"""
+    products = deduplicate_products(products, cross_site=cross_site)
     
-    products = deduplicate_products(products)
+    # Numeric fields, savings, classification and order in bulk
+    columns = product_columns(products)
+    classes = classify(columns)
+    savings_column = savings(columns)
+    order = rank(columns, classes, limit)
+    scraped_at = time.strftime('%Y-%m-%d %H:%M:%S')
     
     enhanced_products = []
     
-    for idx, p in enumerate(products):
+    for idx in order:
+        p = products[idx]
         # Add metadata
         p['id'] = f"prod_{idx + 1:04d}"
-        p['scraped_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        p['scraped_at'] = scraped_at
         p['currency'] = 'INR'
-        p['source_website'] = website
+        source = p.get('source_website') or website or 'unknown'
+        p['source_website'] = source
         
         # Defaults
         p.setdefault('name', 'Unknown Product')
@@ -588,22 +1352,19 @@ def enhance_and_sort(products: List[Dict], website: str) -> List[Product]:
         p.setdefault('colour', 'Unknown')
         p.setdefault('category', 'footwear')
         
-        # Type conversions with error handling
-        try:
-            p['price'] = float(p.get('price', 0) or 0)
-            p['original_price'] = float(p.get('original_price', p['price']) or p['price'])
-            p['discount'] = int(p.get('discount', 0) or 0)
-            p['rating'] = float(p.get('rating', 0) or 0)
-            p['reviews'] = int(p.get('reviews', 0) or 0)
-        except:
-            pass
-        
-        p['in_stock'] = bool(p.get('in_stock', True))
+        p['price'] = float(columns['price'][idx])
+        p['original_price'] = float(columns['original_price'][idx])
+        p['discount'] = int(columns['discount'][idx])
+        p['rating'] = float(columns['rating'][idx])
+        p['reviews'] = int(columns['reviews'][idx])
+        p['savings'] = float(savings_column[idx])
+        p['in_stock'] = bool(columns['in_stock'][idx])
         p['is_trending'] = bool(p.get('is_trending', False))
+        p['product_classification'] = CLASS_VALUES[classes[idx]]
         
         # Fix Amazon image URLs
         image_url = p.get('image_url', '')
-        if 'amazon' in website.lower() and image_url:
+        if 'amazon' in source.lower() and image_url:
             p['image_url'] = fix_amazon_image_url(image_url)
         
         # Validate URLs
@@ -614,104 +1375,341 @@ def enhance_and_sort(products: List[Dict], website: str) -> List[Product]:
         if not product_url or not product_url.startswith('http'):
             p['product_url'] = '#'
         
-        # Savings
-        try:
-            if p['original_price'] > p['price'] > 0:
-                p['savings'] = round(p['original_price'] - p['price'], 2)
-            else:
-                p['savings'] = 0.0
-        except:
-            p['savings'] = 0.0
-        
-        # Classify product
-        p['product_classification'] = classify_product(p)
-        
         # Set availability status
         if 'availability_status' not in p:
             p['availability_status'] = "in_stock" if p['in_stock'] else "out_of_stock"
         
-        # Create Pydantic model (will use defaults for missing fields)
+        enhanced_products.append(p)
+    
+    # Order: In-Stock First → Trending → Top Selling → Rating → Reviews → Discount (see rank)
+    in_stock_count = sum(1 for p in enhanced_products if p['in_stock'])
+    out_of_stock_count = len(enhanced_products) - in_stock_count
+    print(f"   📊 Sorted: {in_stock_count} in-stock, {out_of_stock_count} out-of-stock"
+          f" (top {len(order)} of {len(products)})")
+    
+    return enhanced_products
+
+
+def to_product_models(records: List[ProductRecord]) -> List[Product]:
+    """Validate records into Product models - the one Pydantic pass, at the API boundary"""
+    products = []
+    for record in records:
         try:
-            product_model = Product(**p)
-            enhanced_products.append(product_model)
+            products.append(record.to_product())
         except Exception as e:
             print(f"   ⚠️ Product validation error: {str(e)[:100]}")
             # Still try to include with minimal data
             try:
-                minimal_product = Product(
-                    name=p.get('name', 'Unknown'),
-                    brand=p.get('brand', 'Unknown'),
-                    price=p.get('price', 0),
-                    product_url=p.get('product_url', '#'),
-                    image_url=p.get('image_url', 'https://via.placeholder.com/600x600?text=No+Image')
-                )
-                enhanced_products.append(minimal_product)
+                products.append(Product(
+                    name=record.get('name', 'Unknown'),
+                    brand=record.get('brand', 'Unknown'),
+                    price=record.get('price', 0),
+                    product_url=record.get('product_url', '#'),
+                    image_url=record.get('image_url', 'https://via.placeholder.com/600x600?text=No+Image')
+                ))
             except:
                 print(f"   ❌ Failed to include product")
+    return products
+
+
+# ============================================================================
+# STREAMING PIPELINE (SEARCH → SCRAPE → EXTRACT)
+# ============================================================================
+
+_STOP = object()
+_llm_executor = ThreadPoolExecutor(max_workers=EXTRACT_CONCURRENCY, thread_name_prefix='llm-extract')
+
+
+async def stream_extract_products(pool: Optional[BrowserPool], website: str, filters: ProductFilters,
+                                  max_results: int = 50, replay: bool = False,
+                                  target: Optional[int] = None, stop_at: Optional[float] = None,
+                                  scrape_concurrency: int = SCRAPE_CONCURRENCY,
+                                  llm_concurrency: int = EXTRACT_CONCURRENCY,
+                                  quota: Optional['SharedTarget'] = None) -> ProductList:
+    """
+    Run search, scrape and extraction as overlapping stages
     
-# Sort: In-Stock First → Trending → Top Selling → Rating → Reviews → Discount
-    enhanced_products.sort(key=lambda x: (
-        not x.in_stock,  # In-stock products first
-        x.product_classification != ProductCategory.TRENDING.value,
-        x.product_classification != ProductCategory.TOP_SELLING.value,
-        -x.rating,
-        -x.reviews,
-        -x.discount
-    ))
-    
-    in_stock_count = sum(1 for p in enhanced_products if p.in_stock)
-    out_of_stock_count = len(enhanced_products) - in_stock_count
-    print(f"   📊 Sorted: {in_stock_count} in-stock, {out_of_stock_count} out-of-stock")
+    Each stage is a set of workers joined to the next by a bounded queue, so a
+    page goes to extraction as soon as it is scraped and a full queue pauses
+    the stage feeding it (backpressure keeps at most a few pages in memory).
+    With replay, URLs and pages come from the page archive (no network, no
+    browser pool needed) and the parsed-page cache is bypassed.
     
-    return enhanced_products
+    Once `target` in-stock matches are confirmed, or at `stop_at` (a
+    time.monotonic() value), every stage is cancelled and the products so far
+    are returned with the stop reason. With a target (or quota) URLs keep
+    flowing past max_results up to the search over-fetch, so pages that turn
+    out out of stock or off-filter are made up for. LLM calls still queued in the executor
+    are cancelled; ones already running finish in the background and are dropped.
+    
+    `scrape_concurrency` and `llm_concurrency` cap this run's scrape workers and
+    LLM batches in flight, so concurrent runs split the shared browser pool and
+    LLM executor fairly. With a `quota` (instead of `target`) the run pauses
+    while it is at its share of a target shared with other sites' runs, and
+    stops when that shared target is met.
+    """
+    loop = asyncio.get_running_loop()
+    url_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    page_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stats = FetchStats()
+    products = []
+    counts = {'urls': 0, 'pages': 0, 'cached_pages': 0, 'in_stock': 0}
+    seen_keys = set()
+    batch_tasks: List[asyncio.Task] = []
+    llm_slots = asyncio.Semaphore(max(1, llm_concurrency))
+    stop = asyncio.Event()
+    stop_reason: Optional[str] = None
+    
+    def stop_early(reason: str):
+        nonlocal stop_reason
+        if not stop.is_set():
+            stop_reason = reason
+            stop.set()
+    
+    # html_budget's condition lives on the runtime loop; replay runs on its own loop
+    budget = MemoryBudget() if replay else html_budget
+    url_limit = int(max_results * CSE_OVERFETCH + 0.5) if target or quota is not None else max_results
+    
+    async def enqueue(item: Dict):
+        await url_queue.put(item)
+        counts['urls'] += 1
+    
+    async def search_stage():
+        if replay:
+            product_urls = await asyncio.to_thread(page_archive.replay_items, website, url_limit)
+            print(f"📼 Replaying {len(product_urls)} archived {website} pages")
+            for item in product_urls[:url_limit]:
+                await enqueue(item)
+            return
+        
+        # The search runs on a worker thread and hands over each result page as it
+        # arrives, so scraping starts after the first CSE call rather than the last.
+        # A full url_queue blocks the search thread too (no CSE calls run ahead).
+        halted = threading.Event()
+        
+        def emit(items: List[Dict]) -> bool:
+            for item in items:
+                if halted.is_set() or counts['urls'] >= url_limit:
+                    return False
+                put = asyncio.run_coroutine_threadsafe(enqueue(item), loop)
+                while True:
+                    try:
+                        put.result(timeout=0.2)
+                        break
+                    except FutureTimeoutError:
+                        if halted.is_set():
+                            put.cancel()
+                            return False
+            return counts['urls'] < url_limit
+        
+        try:
+            await asyncio.to_thread(search_planned_urls, filters, website, max_results, emit)
+        finally:
+            halted.set()
+    
+    async def scrape_stage():
+        while True:
+            item = await url_queue.get()
+            if item is _STOP:
+                return
+            key = item.get('key') or product_key(item['url'])
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            if quota is not None:
+                await quota.reserve(website)
+            
+            # A product parsed by an earlier request is reused without fetching it again
+            cache_key = ExtractionCache.make_key('parsed', key, str(PAGE_TOKEN_BUDGET), PARSE_VERSION)
+            parsed = ExtractionCache.MISS if replay else await asyncio.to_thread(page_cache.get, cache_key)
+            if parsed is not ExtractionCache.MISS:
+                counts['cached_pages'] += 1
+                await page_queue.put({'url': item['url'], 'title': item['title'], 'parsed': parsed})
+                continue
+            
+            # Only the small parsed result travels on - the raw HTML is dropped on arrival
+            parsed = await fetch_and_reduce(pool, item['url'], stats, budget=budget, replay=replay)
+            if not parsed:
+                if quota is not None:
+                    quota.settle(website, False)
+                continue
+            counts['pages'] += 1
+            print(f"   ✅ Scraped {counts['pages']}: {item['url'][:60]}")
+            if not replay:
+                await asyncio.to_thread(page_cache.set, cache_key, parsed)
+            await page_queue.put({'url': item['url'], 'title': item['title'], 'parsed': parsed})
+    
+    async def run_batch(batch: List[Dict]):
+        # Executor threads cap parallelism at EXTRACT_CONCURRENCY (llm_concurrency per run);
+        # llm_limiter adapts below that
+        try:
+            async with llm_slots:
+                answers = await loop.run_in_executor(_llm_executor, extract_products_multi_llm, batch, filters)
+        except Exception as e:
+            print(f"      ⚠️ Error: {str(e)[:50]}")
+            for _ in batch:
+                add_product(None)
+            return
+        for item in batch:
+            add_product(finish_product(answers.get(item['url']), item['structured'], item['url'], filters))
+    
+    def add_product(product: Optional[ProductRecord]):
+        # Called once per extracted page, match or not
+        if quota is not None:
+            quota.settle(website, bool(product and product.get('in_stock')))
+        if product and not stop.is_set():
+            products.append(product)
+            status = product.get('availability_status', 'unknown')
+            print(f"      ✅ Match: {str(product.get('name', ''))[:40]} [{status}]")
+            if product.get('in_stock'):
+                counts['in_stock'] += 1
+                # URLs are already deduped, so near-duplicates are the only overcount here
+                if quota is None and target and counts['in_stock'] >= target:
+                    stop_early('target')
+    
+    async def extract_stage():
+        # Pages the structured extractors can't finish are packed into multi-page
+        # LLM batches; a batch is sent when full or after BATCH_LINGER of quiet,
+        # and several batches run at once
+        pending: List[Dict] = []
+        pending_tokens = 0
+        
+        def flush():
+            nonlocal pending, pending_tokens
+            if pending and not stop.is_set():
+                batch_tasks.append(asyncio.create_task(run_batch(pending)))
+            pending, pending_tokens = [], 0
+        
+        while True:
+            try:
+                page = await asyncio.wait_for(page_queue.get(), timeout=BATCH_LINGER if pending else None)
+            except asyncio.TimeoutError:
+                flush()
+                continue
+            if page is _STOP:
+                break
+            
+            structured, complete = resolve_structured(page['parsed'], page['url'], filters)
+            if complete:
+                add_product(finish_product(None, structured, page['url'], filters, from_llm=False))
+                continue
+            
+            tokens = estimate_tokens(page['parsed']['reduced'])
+            if pending and (pending_tokens + tokens > BATCH_TOKEN_BUDGET or len(pending) >= BATCH_MAX_PAGES):
+                flush()
+            pending.append({'url': page['url'], 'reduced': page['parsed']['reduced'], 'structured': structured})
+            pending_tokens += tokens
+        
+        flush()
+        await asyncio.gather(*batch_tasks)
+    
+    scrapers = [asyncio.create_task(scrape_stage()) for _ in range(max(1, min(scrape_concurrency, url_limit)))]
+    if pool is not None and len(scrapers) > pool.capacity:
+        print(f"   ℹ️ {len(scrapers)} scrape workers share {pool.capacity} browser contexts "
+              f"(browser renders are capped there; HTTP fast-path fetches are not)")
+    extractors = [asyncio.create_task(extract_stage())]
+    
+    async def run_stages():
+        await search_stage()
+        for _ in scrapers:
+            await url_queue.put(_STOP)
+        await asyncio.gather(*scrapers)
+        
+        for _ in extractors:
+            await page_queue.put(_STOP)
+        await asyncio.gather(*extractors)
+    
+    flow = asyncio.create_task(run_stages())
+    stopped = asyncio.create_task(stop.wait())
+    # Another site's run can meet a shared target
+    filled = asyncio.create_task(quota.filled.wait()) if quota is not None else stopped
+    try:
+        timeout = max(stop_at - time.monotonic(), 0.0) if stop_at is not None else None
+        done, _ = await asyncio.wait({flow, stopped, filled}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if flow in done:
+            flow.result()
+        elif filled in done:
+            stop_early('target')
+        elif not stop.is_set():
+            stop_early('deadline')
+        if stop_reason:
+            print(f"⏱️ Stopping early ({stop_reason}): {counts['in_stock']} in-stock matches, "
+                  f"cancelling remaining fetches and LLM batches")
+    finally:
+        for task in [flow, stopped, filled] + scrapers + extractors + batch_tasks:
+            task.cancel()
+    
+    FETCH_STATS.merge(stats)
+    stats.report()
+    domain_scheduler.report()
+    print(f"   🏎️ Hedged loads: {hedge_controller.stats()}")
+    cache_stats = extraction_cache.stats()
+    print(f"   🚦 LLM limiter: {llm_limiter.snapshot()}")
+    print(f"   🧮 Raw HTML memory: {budget.stats()}")
+    EXTRACTION_FAILURES.report()
+    EXTRACTOR_COVERAGE.report()
+    print(f"   🗄️ Extraction cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['entries']} entries)")
+    print(f"✅ Pipeline: {counts['urls']} URLs → {counts['pages']} pages "
+          f"(+{counts['cached_pages']} from page cache) → {len(products)} products"
+          + (f" [stopped early: {stop_reason}]" if stop_reason else ""))
+    return ProductList(products, stop_reason=stop_reason)
 
 
 # ============================================================================
 # MAIN SCRAPING ORCHESTRATOR
 # ============================================================================
 
-def scrape_products(website: str, filters: ProductFilters, max_results: int = 50) -> List[Product]:
+def scrape_products(website: str, filters: ProductFilters, max_results: int = 50,
+                    replay: bool = REPLAY_MODE, deadline: Optional[float] = REQUEST_DEADLINE,
+                    target: Optional[int] = None) -> ProductList:
     """
     Main orchestrator for product scraping
     
     Args:
         website: Website to scrape
         filters: Product filters
-        max_results: Maximum number of product URLs to fetch
+        max_results: Maximum number of products returned
+        replay: Run from the page archive instead of search + live fetches
+                (SCRAPER_REPLAY=1; pages are archived with SCRAPER_ARCHIVE_PAGES=1)
+        deadline: Seconds the whole request may take (SCRAPER_DEADLINE; None/0 = no limit)
+        target: In-stock matches after which scraping stops (default: max_results); until
+                then up to GOOGLE_CSE_OVERFETCH x max_results product URLs are fetched
     
     Returns:
-        List of Product models
+        ProductList of Product models; `.partial` is True when the deadline cut it short
     """
+    started = time.monotonic()
+    stop_at = started + max(deadline - DEADLINE_MARGIN, 0.0) if deadline else None
+    target = max_results if target is None else target
+    
     print(f"\n{'='*70}")
     print(f"🎯 STARTING SCRAPE")
     print(f"{'='*70}")
     print(f"Website: {website}")
     print(f"Filters: {filters.dict()}")
-    print(f"Max Results: {max_results}")
-    
-    # STEP 1: Build search query
-    query = build_search_query(filters)
+    print(f"Max Results: {max_results} (target {target} in-stock, deadline {deadline or '-'}s)")
     
-    # STEP 2: Search product URLs
-    product_urls = search_product_urls(query, website, max_results=max_results)
-    
-    if not product_urls:
-        print("❌ No product URLs found")
-        return []
-    
-    # STEP 3: Scrape product pages (limit to max_results to avoid excessive scraping)
-    urls_to_scrape = product_urls[:min(len(product_urls), max_results)]
-    scraped_pages = scrape_multiple_products(urls_to_scrape, max_workers=15)
-    
-    if not scraped_pages:
-        print("❌ No pages scraped successfully")
-        return []
+    # STEP 1-4: Search, scrape and extract as one streaming pipeline
+    pipeline = dict(target=target, stop_at=stop_at)
+    if replay:
+        # Offline: no browser runtime, pages come from the archive
+        raw_products = asyncio.run(stream_extract_products(None, website, filters, max_results, replay=True, **pipeline))
+    else:
+        runtime = get_runtime()
+        raw_products = runtime.run(stream_extract_products(runtime.pool, website, filters, max_results, **pipeline))
     
-    # STEP 4: Extract with filter matching
-    raw_products = extract_products_batch(scraped_pages, filters, batch_size=10)
+    return finish_scrape(raw_products, website, max_results, started)
+
+
+def finish_scrape(raw_products: ProductList, website: Optional[str], max_results: int,
+                  started: float, cross_site: bool = False) -> ProductList:
+    """Dedupe, rank and trim one scrape's records into the returned Product models"""
+    if not raw_products:
+        print("❌ No products extracted")
+        return ProductList(stop_reason=raw_products.stop_reason)
     
- # STEP 5: Enhance, classify, and sort
-    products = enhance_and_sort(raw_products, website)
+    # STEP 5: Enhance, classify, and sort
+    products = enhance_and_sort(raw_products, website, limit=max_results, cross_site=cross_site)
     
     # STEP 6: Prioritize in-stock products
     in_stock_products = [p for p in products if p.in_stock]
@@ -725,10 +1723,153 @@ def scrape_products(website: str, filters: ProductFilters, max_results: int = 50
     else:
         print(f"   ℹ️ Limited in-stock ({len(in_stock_products)}), including all {len(out_of_stock_products)} out-of-stock")
     
-    products = in_stock_products + out_of_stock_products
+    products = ProductList(to_product_models(in_stock_products + out_of_stock_products),
+                           stop_reason=raw_products.stop_reason)
     
-    print(f"\n✅ SUCCESS! Returning {len(products)} products")
+    print(f"\n✅ SUCCESS! Returning {len(products)} products"
+          + (" (partial - deadline reached)" if products.partial else "")
+          + f" in {time.monotonic() - started:.1f}s")
     print(f"   📊 In-stock: {len(in_stock_products)}, Out-of-stock: {len(out_of_stock_products)}")
     print(f"{'='*70}\n")
     
-    return products
\ No newline at end of file
+    return products
+
+
+class SharedTarget:
+    """
+    In-stock match target split between concurrent site pipelines (one event loop)
+    
+    Each fetch reserves a place in its site's share and settles it once the
+    page has been extracted. Pages in flight count at the site's observed match
+    rate, so a site at its share pauses before its next fetch rather than
+    stopping; if another site later fails or runs out of results, the share it
+    left unused goes to the sites still running.
+    """
+    
+    def __init__(self, total: int, sites: List[str]):
+        self.total = total
+        self.counts = {site: 0 for site in sites}
+        self.pending = {site: 0 for site in sites}
+        self.resolved = {site: 0 for site in sites}
+        self.running = set(sites)
+        self.filled = asyncio.Event()
+        self._changed = asyncio.Event()
+    
+    def share(self, site: str) -> int:
+        """Fair share for a running site: what finished sites left of the total, split evenly"""
+        left = self.total - sum(count for s, count in self.counts.items() if s not in self.running)
+        return max(1, -(-left // max(1, len(self.running))))
+    
+    def _expected(self, site: str) -> float:
+        # Laplace-smoothed match rate - starts at 1, so the first pages are never overcommitted
+        rate = (self.counts[site] + 1) / (self.resolved[site] + 1)
+        return self.counts[site] + self.pending[site] * rate
+    
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def reserve(self, site: str):
+        """Wait until `site` is below its share (or the total is met), then hold a place"""
+        while not self.filled.is_set() and self._expected(site) >= self.share(site):
+            await self._changed.wait()
+        self.pending[site] += 1
+    
+    def settle(self, site: str, matched: bool):
+        """Release a reservation; `matched` when the page gave an in-stock match"""
+        self.pending[site] -= 1
+        self.resolved[site] += 1
+        if matched:
+            self.counts[site] += 1
+            if sum(self.counts.values()) >= self.total:
+                self.filled.set()
+        self._notify()
+    
+    def finish(self, site: str):
+        self.running.discard(site)
+        self._notify()
+
+
+def scrape_websites(websites: List[str], filters: ProductFilters, max_results: int = 50,
+                    replay: bool = REPLAY_MODE, deadline: Optional[float] = REQUEST_DEADLINE) -> ProductList:
+    """
+    Scrape several websites concurrently and merge them into one ranked list
+    
+    Each site runs its own streaming pipeline on the shared browser pool and
+    LLM executor with an equal share of scrape workers and LLM batches and the
+    same deadline, so the total time follows the slowest site. max_results
+    in-stock matches are split evenly between sites (SharedTarget); when a
+    site fails or runs out of results, what it left unused is added to the
+    shares of the sites still running (sites that already stopped at their
+    share pause rather than stop, so they can take it). Records keep their source_website; the merged
+    list is deduplicated across sites (best listing first) and ranked as one.
+    
+    Args:
+        websites: WEBSITES keys to scrape
+        filters: Product filters
+        max_results: Maximum number of products returned across all sites
+        replay: Run from the page archive instead of search + live fetches
+        deadline: Seconds the whole request may take (SCRAPER_DEADLINE; None/0 = no limit)
+    
+    Returns:
+        ProductList of Product models; `.partial` is True when the deadline cut any site short
+    """
+    sites = list(dict.fromkeys(w.lower() for w in websites if w.lower() in WEBSITES))
+    if not sites:
+        print(f"❌ No supported websites in {websites}")
+        return ProductList()
+    
+    started = time.monotonic()
+    stop_at = started + max(deadline - DEADLINE_MARGIN, 0.0) if deadline else None
+    quota = SharedTarget(max_results, sites)
+    
+    print(f"\n{'='*70}")
+    print(f"🎯 STARTING MULTI-SITE SCRAPE")
+    print(f"{'='*70}")
+    print(f"Websites: {', '.join(sites)}")
+    print(f"Filters: {filters.dict()}")
+    print(f"Max Results: {max_results} ({quota.share(sites[0])} per site to start, deadline {deadline or '-'}s)")
+    
+    async def run_site(pool: Optional[BrowserPool], site: str) -> ProductList:
+        # Each site may search up to max_results URLs so it can take over a finished site's share
+        try:
+            return await stream_extract_products(
+                pool, site, filters, max_results, replay=replay, stop_at=stop_at, quota=quota,
+                scrape_concurrency=max(1, SCRAPE_CONCURRENCY // len(sites)),
+                llm_concurrency=max(1, EXTRACT_CONCURRENCY // len(sites)),
+            )
+        finally:
+            quota.finish(site)
+    
+    async def fan_out(pool: Optional[BrowserPool]) -> List:
+        # One failing site must not take the others' results with it
+        return await asyncio.gather(*(run_site(pool, site) for site in sites), return_exceptions=True)
+    
+    if replay:
+        results = asyncio.run(fan_out(None))
+    else:
+        runtime = get_runtime()
+        results = runtime.run(fan_out(runtime.pool))
+    
+    merged: List[ProductRecord] = []
+    stop_reasons = []
+    for site, result in zip(sites, results):
+        if isinstance(result, BaseException):
+            print(f"   ❌ {site}: {str(result)[:80]}")
+            stop_reasons.append(None)
+            continue
+        for record in result:
+            record['source_website'] = site
+        merged.extend(result)
+        stop_reasons.append(result.stop_reason)
+        print(f"   🌐 {site}: {len(result)} products" + (f" (stopped early: {result.stop_reason})" if result.stop_reason else ""))
+    
+    # Dedupe keeps the first of each near-duplicate group - put the best offer first
+    merged = [merged[i] for i in offer_order(product_columns(merged))] if merged else merged
+    if 'deadline' in stop_reasons:
+        stop_reason = 'deadline'
+    elif all(reason == 'target' for reason in stop_reasons):
+        stop_reason = 'target'
+    else:
+        stop_reason = None
+    return finish_scrape(ProductList(merged, stop_reason=stop_reason), None, max_results, started, cross_site=True)
@@ -0,0 +1,77 @@
+"""
+Benchmark: reduce_html (lxml, token-budgeted) vs the previous BeautifulSoup clean_html
+
+Usage:
+    python -m benchmarks.bench_html_reducer                 # synthetic ~2 MB product page
+    python -m benchmarks.bench_html_reducer page1.html ...  # saved product pages
+"""
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from app.html_reducer import estimate_tokens, reduce_html
+
+
+def legacy_clean_html(html: str) -> str:
+    """clean_html as it was before the reducer (html.parser, raw markup, 80k chars)"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'iframe', 'svg']):
+        tag.decompose()
+
+    product_sections = soup.find_all(['div', 'article'], class_=lambda x: x and any(
+        k in str(x).lower() for k in ['product', 'detail', 'info', 'item']
+    ))
+
+    cleaned = '\n'.join([str(s) for s in product_sections[:50]]) if product_sections else str(soup.find('body') or soup)
+    return cleaned[:80000]
+
+
+def synthetic_page(repeat: int = 4000) -> str:
+    """Product page padded with the kind of markup real PDPs carry (~2 MB)"""
+    product = '''
+    <div class="pdp-product-info product-detail" data-testid="pdp" style="display:flex">
+      <h1 class="pdp-title">Nike Revolution 6 Next Nature Men's Running Shoes</h1>
+      <div class="pdp-price-info"><span class="pdp-price">₹2,995</span>
+        <span class="pdp-mrp">MRP ₹3,695</span><span class="pdp-discount">(19% OFF)</span></div>
+      <div class="rating-info">4.3 ★ 1,245 Ratings & 210 Reviews</div>
+      <div class="size-info">Size: UK 7 UK 8 UK 9 UK 10</div>
+      <div class="colour-info">Colour: Black/White</div>
+      <div class="stock-info">Only 3 left - Add to Bag</div>
+      <img class="pdp-image" alt="Nike Revolution 6" src="https://img.example.com/nike-rev6.jpg">
+      <table class="spec-table"><tr><th>Material</th><td>Mesh</td></tr><tr><th>Sole</th><td>Rubber</td></tr></table>
+    </div>'''
+    filler = '''
+    <div class="recommendation-item widget" data-track='{"id": 1234, "pos": 5}'>
+      <a href="https://www.example.com/some/other/product/p/itm123?pid=ABC&amp;lid=XYZ" class="item-link">
+        <img src="https://img.example.com/thumb.jpg" class="thumb" width="120" height="120" loading="lazy">
+        <div class="item-title">Other product suggestion with a long marketing title</div>
+        <div class="item-price">₹1,499</div></a></div>'''
+    script = '<script>window.__STATE__ = {"tracking": "' + 'x' * 2000 + '"};</script>'
+    return ('<html><head><title>Nike Revolution 6 | Buy Online</title>'
+            '<meta property="og:title" content="Nike Revolution 6">' + script * 50 + '</head><body>'
+            '<header><nav>' + '<a href="/c">Category</a>' * 200 + '</nav></header>'
+            + product + filler * repeat + '<footer>' + 'Links ' * 500 + '</footer></body></html>')
+
+
+def bench(name: str, func, html: str, runs: int):
+    start = time.perf_counter()
+    for _ in range(runs):
+        output = func(html)
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"   {name:<18} {elapsed * 1000:8.1f} ms   {len(output):>8,} chars   ~{estimate_tokens(output):>7,} tokens")
+    return elapsed, output
+
+
+def main(paths):
+    pages = [(p, open(p, encoding='utf-8', errors='replace').read()) for p in paths] or [('synthetic', synthetic_page())]
+    for name, html in pages:
+        print(f"\n📄 {name}: {len(html):,} chars of HTML")
+        legacy_time, _ = bench('legacy clean_html', legacy_clean_html, html, runs=3)
+        reducer_time, _ = bench('reduce_html', reduce_html, html, runs=3)
+        print(f"   ⚡ {legacy_time / reducer_time:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
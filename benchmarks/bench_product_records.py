@@ -0,0 +1,90 @@
+"""
+Benchmark: ProductRecord pipeline vs the previous dict + per-row Product validation
+
+Dedupe is identical in both paths and is left out, so the numbers cover holding
+the products, ranking them and building the Product models.
+
+Usage:
+    python -m benchmarks.bench_product_records            # 20,000 synthetic products
+    python -m benchmarks.bench_product_records 100000
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+import tracemalloc
+
+from app import scraper
+from app.models.models import Product, ProductRecord
+
+LIMIT = 50
+WORDS = [f'w{i}' for i in range(3000)]
+
+
+def synthetic_products(count: int):
+    rng = random.Random(7)
+    for i in range(count):
+        yield {
+            'name': 'Nike ' + ' '.join(rng.sample(WORDS, 8)),
+            'brand': 'Nike',
+            'price': float(rng.randint(300, 6000)),
+            'original_price': float(rng.randint(6000, 9000)),
+            'discount': rng.choice([0, 10, 30, 50]),
+            'image_url': f'https://img.example.com/{i}.jpg',
+            'product_url': f'https://www.example.com/p/{i}',
+            'rating': rng.choice([3.5, 4.0, 4.3, 4.6]),
+            'reviews': rng.randint(0, 3000),
+            'gender': 'Men',
+            'size': '9',
+            'colour': 'Black',
+            'category': 'slippers',
+            'in_stock': rng.random() > 0.2,
+            'availability_status': 'in_stock',
+        }
+
+
+def legacy_pipeline(dicts):
+    """Dict products, every row validated into a Product, then a full sort"""
+    products = [Product(**p) for p in dicts]
+    products.sort(key=lambda x: (not x.in_stock, -x.rating, -x.reviews, -x.discount))
+    return products[:LIMIT]
+
+
+def record_pipeline(records):
+    """ProductRecords through dedupe/ranking, Product models only for the returned rows"""
+    return scraper.to_product_models(scraper.enhance_and_sort(records, 'amazon', limit=LIMIT))
+
+
+def measure(name: str, build, run):
+    # Timing and allocation tracing in separate passes - tracemalloc slows everything down
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = run(build())
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    items = build()
+    held, _ = tracemalloc.get_traced_memory()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {name:<10} {elapsed * 1000:9.1f} ms   held {held / 2**20:7.1f} MiB   peak {peak / 2**20:7.1f} MiB"
+          f"   → {len(output)} products")
+    return elapsed, peak
+
+
+def main(count: int):
+    print(f"\n📦 {count:,} products (already unique), top {LIMIT} returned")
+    scraper.deduplicate_products = lambda products, **kwargs: products
+
+    legacy_time, legacy_peak = measure('legacy', lambda: list(synthetic_products(count)), legacy_pipeline)
+    record_time, record_peak = measure(
+        'records', lambda: [ProductRecord.from_dict(p) for p in synthetic_products(count)], record_pipeline
+    )
+    print(f"   ⚡ {legacy_time / record_time:.1f}x faster, {legacy_peak / record_peak:.1f}x less peak memory")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -175,7 +175,8 @@ async def bom_orthographic_view(file: UploadFile = File(...)):
 #             total_products=len(products),
 #             products=products,
 #             timestamp=time.strftime('%Y-%m-%d %H:%M:%S'),
-#             error=None
+#             error=None,
+#             partial=products.partial
 #         )
         
 #         return response
@@ -0,0 +1,57 @@
+import pytest
+
+from app.canonical import canonicalize_url, dedupe_urls, product_key
+
+
+@pytest.mark.parametrize('url', [
+    'https://www.amazon.in/Nike-Revolution-Running-Shoe/dp/B0CXYZ1234/ref=sr_1_3?keywords=nike&th=1',
+    'https://www.amazon.in/gp/product/B0CXYZ1234?psc=1',
+])
+def test_amazon_urls_map_to_the_asin(url):
+    assert canonicalize_url(url) == ('https://www.amazon.in/dp/B0CXYZ1234', 'amazon:B0CXYZ1234')
+
+
+def test_amazon_asin_key_ignores_host_and_case():
+    assert product_key('https://amazon.in/dp/b0cxyz1234/') == 'amazon:B0CXYZ1234'
+
+
+def test_flipkart_item_id_and_pid():
+    clean, key = canonicalize_url(
+        'https://www.flipkart.com/nike-revolution/p/itm123abc456?pid=SHOGZ123&lid=LST&marketplace=FLIPKART'
+    )
+    assert key == 'flipkart:itm123abc456'
+    assert clean == 'https://www.flipkart.com/nike-revolution/p/itm123abc456?pid=SHOGZ123'
+
+
+def test_flipkart_size_variants_share_a_key():
+    a = product_key('https://www.flipkart.com/nike/p/itm123abc456?pid=SHOGZ123')
+    b = product_key('https://dl.flipkart.com/dl/nike/p/itm123abc456?pid=SHOGZ124')
+    assert a == b
+
+
+def test_flipkart_pid_only():
+    assert product_key('https://www.flipkart.com/some/page?pid=shogz123') == 'flipkart:SHOGZ123'
+
+
+def test_myntra_and_reliance_ids():
+    assert product_key('https://www.myntra.com/sports-shoes/nike/revolution/12345678/buy?src=x') == 'myntra:12345678'
+    assert product_key('https://www.reliancedigital.in/boat-earbuds/p/493665123') == 'reliancedigital:493665123'
+
+
+def test_unknown_layout_drops_query_and_fragment():
+    assert canonicalize_url('https://shop.example.com/item/42/?utm_source=g#reviews') == (
+        'https://shop.example.com/item/42', None
+    )
+    assert product_key('https://shop.example.com/item/42?x=1') == 'url:https://shop.example.com/item/42'
+
+
+def test_dedupe_urls_keeps_the_first_per_product():
+    items = [
+        {'url': 'https://www.amazon.in/x/dp/B0CXYZ1234/ref=a', 'title': 'first'},
+        {'url': 'https://www.amazon.in/gp/product/B0CXYZ1234', 'title': 'second'},
+        {'url': 'https://www.myntra.com/shoes/12345678/buy', 'title': 'third'},
+    ]
+    unique = dedupe_urls(items)
+    assert [i['title'] for i in unique] == ['first', 'third']
+    assert unique[0]['url'] == 'https://www.amazon.in/dp/B0CXYZ1234'
+    assert unique[0]['key'] == 'amazon:B0CXYZ1234'
@@ -0,0 +1,67 @@
+from app.dedupe import NearDuplicateIndex, image_key, jaccard, name_shingles
+
+NAME = "Nike Men's Revolution 7 Running Shoe, Black/White"
+
+
+def product(name=NAME, price=2995.0, **fields):
+    return {'name': name, 'price': price, **fields}
+
+
+def test_shingles_ignore_order_case_and_filler():
+    assert name_shingles('Buy Nike Revolution 7 Online') == name_shingles('revolution 7 nike')
+    assert jaccard({'a', 'b'}, {'b', 'c'}) == 1 / 3
+
+
+def test_amazon_image_size_variants_share_a_key():
+    a = image_key('https://m.media-amazon.com/images/I/71abcXYZ._AC_UL320_.jpg')
+    b = image_key('https://m.media-amazon.com/images/I/71abcXYZ._AC_SY695_.jpg?x=1')
+    assert a == b == '71abcXYZ.jpg'
+    assert image_key('https://via.placeholder.com/600x600?text=No+Image') is None
+
+
+def test_same_canonical_url_is_a_duplicate():
+    index = NearDuplicateIndex()
+    assert index.add(product(product_url='https://www.amazon.in/x/dp/B0CXYZ1234/ref=a'))
+    assert not index.add(product(name='Something else', product_url='https://www.amazon.in/dp/B0CXYZ1234'))
+
+
+def test_reworded_name_at_the_same_price_is_a_duplicate():
+    index = NearDuplicateIndex()
+    assert index.add(product())
+    assert not index.add(product(name="Nike Revolution 7 Running Shoe for Men Black/White", price=2990.0))
+
+
+def test_price_or_colour_difference_keeps_both():
+    index = NearDuplicateIndex()
+    assert index.add(product(colour='Black'))
+    assert index.add(product(price=3995.0, colour='Black'))
+    assert index.add(product(colour='Blue'))
+
+
+def test_list_valued_colours_do_not_crash():
+    # schema.org allows lists; this used to raise AttributeError inside enhance_and_sort
+    index = NearDuplicateIndex()
+    assert index.add(product(colour=['Black', 'White']))
+    assert not index.add(product(colour=['Black', 'White']))
+    assert index.add(product(colour='Red'))
+
+
+def test_same_image_needs_less_name_overlap():
+    index = NearDuplicateIndex()
+    image = 'https://rukminim2.flixcart.com/image/832/832/xif0q/shoe/abc123.jpeg'
+    assert index.add(product(name='Nike Revolution 7 Black', image_url=image))
+    assert not index.add(product(name='Nike Revolution 7 Running Sneakers Black', image_url=image))
+
+
+def test_cross_site_listings_match_despite_the_price_gap():
+    amazon = product(price=999.0, source_website='amazon')
+    flipkart = product(price=1099.0, source_website='flipkart')
+
+    same_site_rules = NearDuplicateIndex()
+    assert same_site_rules.add(amazon) and same_site_rules.add(flipkart)
+
+    cross_site = NearDuplicateIndex(cross_site=True)
+    assert cross_site.add(amazon)
+    assert not cross_site.add(flipkart)
+    # Within one store the price guard still applies
+    assert cross_site.add(product(price=1299.0, source_website='amazon'))
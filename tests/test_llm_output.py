@@ -0,0 +1,71 @@
+import pytest
+
+from app.llm_output import coerce_product, missing_answer_fields, parse_llm_json
+
+
+def test_plain_json():
+    assert parse_llm_json('{"name": "Nike", "price": 999}') == {'name': 'Nike', 'price': 999}
+
+
+def test_code_fence_and_leading_text():
+    text = 'Here is the product:\n```json\n{"name": "Nike", "price": 999}\n```'
+    assert parse_llm_json(text) == {'name': 'Nike', 'price': 999}
+
+
+def test_trailing_commas():
+    assert parse_llm_json('{"sizes": ["8", "9",], "price": 999,}') == {'sizes': ['8', '9'], 'price': 999}
+
+
+def test_python_literals():
+    assert parse_llm_json('{"in_stock": True, "trending": False, "rating": None}') == {
+        'in_stock': True, 'trending': False, 'rating': None,
+    }
+
+
+def test_extra_text_after_the_object():
+    assert parse_llm_json('{"name": "Nike"} Hope this helps!') == {'name': 'Nike'}
+
+
+def test_truncated_response_drops_only_the_partial_field():
+    text = '{"products": [{"name": "A", "price": 1}, {"name": "B", "pri'
+    assert parse_llm_json(text) == {'products': [{'name': 'A', 'price': 1}, {'name': 'B'}]}
+
+
+def test_truncated_inside_a_string():
+    assert parse_llm_json('{"name": "Nike Revolution", "brand": "Ni') == {'name': 'Nike Revolution'}
+
+
+def test_truncated_number_is_dropped():
+    assert parse_llm_json('{"product": {"name": "X", "price": 12') == {'product': {'name': 'X'}}
+
+
+def test_truncated_after_a_complete_element():
+    assert parse_llm_json('{"sizes": ["8", "9"], "tags": [{"a": 1}') == {'sizes': ['8', '9'], 'tags': [{'a': 1}]}
+
+
+def test_null_answer():
+    assert parse_llm_json('```json\nnull\n```') is None
+
+
+@pytest.mark.parametrize('text', [None, 'no product here', ''])
+def test_unusable_responses_raise(text):
+    with pytest.raises(ValueError):
+        parse_llm_json(text)
+
+
+def test_coerce_product_types_and_ranges():
+    product = coerce_product({
+        'name': ' Nike ', 'price': '₹1,299', 'discount': '140%', 'rating': 7, 'reviews': '1,024',
+        'in_stock': 'yes', 'availability_status': 'maybe', 'colour': '', 'size': None,
+    })
+    assert product == {
+        'name': 'Nike', 'price': 1299.0, 'discount': 100, 'rating': 5.0, 'reviews': 1024, 'in_stock': True,
+    }
+
+
+def test_coerce_product_rejects_non_objects():
+    assert coerce_product(['Nike']) is None
+
+
+def test_missing_answer_fields_uses_known_values():
+    assert missing_answer_fields({'name': 'Nike'}, known={'price': 999}, required=('name', 'price', 'brand')) == ['brand']
@@ -0,0 +1,52 @@
+from app.models.models import ProductFilters
+from app.query_planner import plan_queries, share_budget
+
+
+def test_single_brand_is_not_split():
+    filters = ProductFilters(brand=['Nike'], gender=['Men'], color=['Black', 'White'])
+    assert plan_queries(filters) == [filters]
+
+
+def test_one_sub_query_per_brand_without_multi_colour_terms():
+    filters = ProductFilters(brand=['Nike', 'Adidas', 'Puma'], gender=['Men'], color=['Black', 'White'])
+    plan = plan_queries(filters)
+    assert [p.brand for p in plan] == [['Nike'], ['Adidas'], ['Puma']]
+    assert all(p.gender == ['Men'] and p.color is None for p in plan)
+
+
+def test_single_colour_is_kept():
+    plan = plan_queries(ProductFilters(brand=['Nike', 'Puma'], color=['Black']))
+    assert all(p.color == ['Black'] for p in plan)
+
+
+def test_genders_split_while_within_the_plan_limit():
+    plan = plan_queries(ProductFilters(brand=['Nike', 'Puma'], gender=['Men', 'Women']), max_queries=4)
+    assert sorted((p.brand[0], p.gender[0]) for p in plan) == [
+        ('Nike', 'Men'), ('Nike', 'Women'), ('Puma', 'Men'), ('Puma', 'Women'),
+    ]
+
+
+def test_extra_brands_share_sub_queries_instead_of_being_dropped():
+    brands = [f'b{i}' for i in range(10)]
+    plan = plan_queries(ProductFilters(brand=brands, gender=['Men', 'Women']), max_queries=8)
+    assert len(plan) == 8
+    assert sorted(b for p in plan for b in p.brand) == sorted(brands)
+    assert all(p.gender == ['Men', 'Women'] for p in plan)
+
+
+def test_share_budget_is_proportional_and_adds_up():
+    assert share_budget(30, [0.5, 0.1, 0.4]) == [15, 3, 12]
+    assert sum(share_budget(10, [1, 1, 1])) == 10
+
+
+def test_share_budget_water_fills_around_caps():
+    # The capped share keeps 3; its remaining 12 goes to the others by weight
+    assert share_budget(30, [0.5, 0.1, 0.4], [3, float('inf'), float('inf')]) == [3, 5, 22]
+
+
+def test_share_budget_never_exceeds_the_caps_total():
+    assert share_budget(50, [1, 2], [4, 6]) == [4, 6]
+
+
+def test_share_budget_skips_zero_weights():
+    assert share_budget(9, [0, 1, 2]) == [0, 3, 6]
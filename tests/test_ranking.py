@@ -0,0 +1,64 @@
+import random
+
+from app.models.models import ProductCategory
+from app.ranking import (CLASS_NORMAL, CLASS_TOP_SELLING, CLASS_TRENDING, CLASS_VALUES, classify,
+                         offer_order, product_columns, rank, savings)
+
+
+def test_columns_apply_the_row_defaults():
+    columns = product_columns([
+        {'price': '999', 'original_price': None, 'discount': 140, 'rating': 7, 'reviews': -3},
+        {'price': 500, 'original_price': 800, 'in_stock': False},
+    ])
+    assert columns['price'].tolist() == [999.0, 500.0]
+    assert columns['original_price'].tolist() == [999.0, 800.0]  # missing → price
+    assert columns['discount'].tolist() == [100, 0]
+    assert columns['rating'].tolist() == [5.0, 0.0]
+    assert columns['reviews'].tolist() == [0, 0]
+    assert columns['in_stock'].tolist() == [True, False]
+    assert savings(columns).tolist() == [0.0, 300.0]
+
+
+def test_classify():
+    columns = product_columns([
+        {'discount': 30, 'rating': 4.0},
+        {'reviews': 500, 'rating': 4.2},
+        {'discount': 50, 'reviews': 900, 'rating': 4.5},
+        {'discount': 29, 'reviews': 499, 'rating': 4.9},
+    ])
+    assert classify(columns).tolist() == [CLASS_TRENDING, CLASS_TOP_SELLING, CLASS_TRENDING, CLASS_NORMAL]
+    assert CLASS_VALUES[CLASS_TOP_SELLING] == ProductCategory.TOP_SELLING.value
+
+
+def _sort_key(p):
+    trending = p['discount'] >= 30 and p['rating'] >= 4.0
+    top_selling = p['reviews'] >= 500 and p['rating'] >= 4.2
+    tier = 0 if trending else 1 if top_selling else 2
+    return (not p['in_stock'], tier, -p['rating'], -p['reviews'], -p['discount'])
+
+
+def test_rank_matches_a_full_sort_with_and_without_limit():
+    rng = random.Random(3)
+    products = [{
+        'in_stock': rng.random() > 0.3,
+        'rating': rng.choice([3.5, 4.0, 4.2, 4.6]),
+        'reviews': rng.choice([10, 500, 900]),
+        'discount': rng.choice([0, 10, 30, 50]),
+    } for _ in range(300)]
+    columns = product_columns(products)
+    classes = classify(columns)
+    expected = sorted(range(len(products)), key=lambda i: _sort_key(products[i]))
+
+    assert rank(columns, classes).tolist() == expected
+    assert rank(columns, classes, limit=25).tolist() == expected[:25]
+    assert rank(columns, classes, limit=0).tolist() == []
+
+
+def test_offer_order_puts_in_stock_cheapest_first():
+    columns = product_columns([
+        {'price': 1099, 'in_stock': True},
+        {'price': 0, 'in_stock': True},
+        {'price': 499, 'in_stock': False},
+        {'price': 999, 'in_stock': True},
+    ])
+    assert offer_order(columns).tolist() == [3, 0, 1, 2]
@@ -0,0 +1,24 @@
+from app.rate_limit import AdaptiveLimiter
+
+
+def test_a_burst_of_throttled_calls_cuts_the_limit_once():
+    limiter = AdaptiveLimiter(rpm=1000, tpm=10**6, initial=8, maximum=16)
+    burst = [limiter.acquire() for _ in range(8)]
+    for entry in burst:
+        limiter.release(entry, 'throttled')
+    assert limiter.limit == 4
+    assert limiter.stats['throttled'] == 8
+
+
+def test_a_call_started_after_the_cut_can_cut_again():
+    limiter = AdaptiveLimiter(rpm=1000, tpm=10**6, initial=8, maximum=16)
+    limiter.release(limiter.acquire(), 'throttled')
+    limiter.release(limiter.acquire(), 'timeout')
+    assert limiter.limit == 2
+
+
+def test_successes_grow_the_limit_additively():
+    limiter = AdaptiveLimiter(rpm=1000, tpm=10**6, initial=4, maximum=16)
+    for _ in range(4):
+        limiter.release(limiter.acquire(), 'ok')
+    assert 4.9 < limiter.limit < 5.0
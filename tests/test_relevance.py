@@ -0,0 +1,42 @@
+from app.models.models import PriceRange, ProductFilters
+from app.relevance import score_search_result
+
+FILTERS = ProductFilters(brand=['Nike'], gender=['Men'], color=['Black'], category='running shoes',
+                         price_range=PriceRange(min=1000, max=3000))
+
+
+def result(title, snippet='', **metatags):
+    item = {'title': title, 'snippet': snippet}
+    if metatags:
+        item['pagemap'] = {'metatags': [metatags]}
+    return item
+
+
+def test_matching_result_scores_higher_than_a_vague_one():
+    good = score_search_result(result("Nike Revolution Men's Black Running Shoes"), FILTERS)
+    vague = score_search_result(result('Sports shoes'), FILTERS)
+    assert good is not None and vague is not None
+    assert good > vague
+
+
+def test_conflicting_pagemap_brand_is_rejected():
+    assert score_search_result(result('Running shoes for men', **{'product:brand': 'Adidas'}), FILTERS) is None
+
+
+def test_listed_price_outside_the_range_is_rejected():
+    item = result('Nike running shoes men', **{'product:price:amount': '7999'})
+    assert score_search_result(item, FILTERS) is None
+
+
+def test_listed_price_within_the_tolerance_is_kept():
+    item = result('Nike running shoes men', **{'product:price:amount': '3300'})
+    assert score_search_result(item, FILTERS) is not None
+
+
+def test_other_gender_only_is_rejected_but_unisex_is_kept():
+    assert score_search_result(result("Nike Women's Running Shoes"), FILTERS) is None
+    assert score_search_result(result('Nike Unisex Running Shoes for Men and Women'), FILTERS) is not None
+
+
+def test_missing_evidence_only_lowers_the_score():
+    assert score_search_result(result('Product page'), FILTERS) == 0.0
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.scraper import SharedTarget
+
+
+def test_shares_split_evenly_and_pass_on_what_a_finished_site_left():
+    target = SharedTarget(20, ['amazon', 'flipkart', 'myntra', 'reliancedigital'])
+    assert target.share('amazon') == 5
+
+    target.finish('myntra')              # failed without a match
+    assert target.share('amazon') == 7   # ceil(20 / 3)
+
+    for _ in range(2):
+        target.pending['reliancedigital'] += 1
+        target.settle('reliancedigital', True)
+    target.finish('reliancedigital')     # ran out after 2 matches
+    assert target.share('amazon') == 9   # (20 - 2) / 2
+
+
+def test_reserve_waits_at_the_share_until_another_site_finishes():
+    async def scenario():
+        target = SharedTarget(4, ['amazon', 'flipkart'])
+        for _ in range(2):
+            await target.reserve('amazon')
+            target.settle('amazon', True)
+
+        waiting = asyncio.create_task(target.reserve('amazon'))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()        # amazon is at its share of 2
+
+        target.finish('flipkart')        # flipkart found nothing: amazon may take all 4
+        await asyncio.wait_for(waiting, 1)
+        target.settle('amazon', True)
+        await target.reserve('amazon')
+        target.settle('amazon', True)
+        assert target.filled.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_misses_lower_the_weight_of_pages_in_flight():
+    async def scenario():
+        target = SharedTarget(2, ['amazon', 'flipkart'])
+        for _ in range(5):
+            await target.reserve('amazon')
+            target.settle('amazon', False)
+        # Match rate 1/6, so several pages may be in flight against a share of 1
+        for _ in range(3):
+            await asyncio.wait_for(target.reserve('amazon'), 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+import asyncio
+
+from app import scraper
+from app.models.models import ProductFilters, ProductRecord
+
+
+def stub_pipeline(monkeypatch, urls, out_of_stock):
+    """Search, fetch and extraction stubs: every page is a product, `out_of_stock` ones aren't in stock"""
+    items = [{'url': url, 'title': 'Nike shoe'} for url in urls]
+
+    def search(filters, website, max_results, on_page=None):
+        on_page(items)
+        return items
+
+    async def fetch(pool, url, stats, budget=None, replay=False):
+        await asyncio.sleep(0)
+        return {'reduced': url, 'url': url}
+
+    def finish(answer, structured, url, filters, from_llm=True):
+        return ProductRecord(name=url, price=999.0, product_url=url, in_stock=url not in out_of_stock)
+
+    monkeypatch.setattr(scraper, 'search_planned_urls', search)
+    monkeypatch.setattr(scraper, 'fetch_and_reduce', fetch)
+    monkeypatch.setattr(scraper, 'resolve_structured', lambda parsed, url, filters: ({}, True))
+    monkeypatch.setattr(scraper, 'finish_product', finish)
+    monkeypatch.setattr(scraper.page_cache, 'get', lambda key: scraper.ExtractionCache.MISS)
+    monkeypatch.setattr(scraper.page_cache, 'set', lambda key, value: None)
+
+
+def test_target_is_met_past_out_of_stock_pages(monkeypatch):
+    urls = [f'https://www.amazon.in/dp/B{i:09d}' for i in range(30)]
+    stub_pipeline(monkeypatch, urls, out_of_stock=set(urls[::4]))
+
+    products = asyncio.run(scraper.stream_extract_products(
+        None, 'amazon', ProductFilters(brand=['Nike']), max_results=10, target=10, scrape_concurrency=1,
+    ))
+
+    assert products.stop_reason == 'target'
+    assert sum(1 for p in products if p.get('in_stock')) == 10
+
+
+def test_without_a_target_only_max_results_urls_are_scraped(monkeypatch):
+    urls = [f'https://www.amazon.in/dp/B{i:09d}' for i in range(30)]
+    stub_pipeline(monkeypatch, urls, out_of_stock=set())
+
+    products = asyncio.run(scraper.stream_extract_products(
+        None, 'amazon', ProductFilters(brand=['Nike']), max_results=10, scrape_concurrency=1,
+    ))
+
+    assert products.stop_reason is None
+    assert len(products) == 10